@@ -0,0 +1,34 @@
+"""Add ai_feedback_cache table
+
+Revision ID: 2b7d4e9a1c3f
+Revises: 6583b9524557
+Create Date: 2026-10-18 09:12:31.418224
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7d4e9a1c3f'
+down_revision: Union[str, None] = '6583b9524557'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ai_feedback_cache',
+        sa.Column('key', sa.String(length=64), primary_key=True),
+        sa.Column('feedback', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_ai_feedback_cache_last_hit_at', 'ai_feedback_cache', ['last_hit_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ai_feedback_cache_last_hit_at', table_name='ai_feedback_cache')
+    op.drop_table('ai_feedback_cache')
@@ -0,0 +1,32 @@
+"""Add (user_id, created_at, id) index to journal_entries
+
+Revision ID: 3f6e2a0c9b17
+Revises: e57b0c8d92aa
+Create Date: 2026-10-18 16:48:19.274403
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6e2a0c9b17'
+down_revision: Union[str, None] = 'e57b0c8d92aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination skips rows with no timestamp, so give old rows one
+    op.execute("UPDATE journal_entries SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.create_index(
+        'ix_journal_entries_user_created',
+        'journal_entries',
+        ['user_id', 'created_at', 'id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_journal_entries_user_created', table_name='journal_entries')
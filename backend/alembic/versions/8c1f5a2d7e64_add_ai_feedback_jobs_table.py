@@ -0,0 +1,46 @@
+"""Add ai_feedback_jobs table
+
+Revision ID: 8c1f5a2d7e64
+Revises: 2b7d4e9a1c3f
+Create Date: 2026-10-18 11:40:07.903512
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f5a2d7e64'
+down_revision: Union[str, None] = '2b7d4e9a1c3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ai_feedback_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('entry_id', sa.Integer(), sa.ForeignKey('journal_entries.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='queued'),
+        sa.Column('charge', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('feedback', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_ai_feedback_jobs_id', 'ai_feedback_jobs', ['id'])
+    op.create_index('ix_ai_feedback_jobs_user_id', 'ai_feedback_jobs', ['user_id'])
+    op.create_index('ix_ai_feedback_jobs_status_run_after', 'ai_feedback_jobs', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ai_feedback_jobs_status_run_after', table_name='ai_feedback_jobs')
+    op.drop_index('ix_ai_feedback_jobs_user_id', table_name='ai_feedback_jobs')
+    op.drop_index('ix_ai_feedback_jobs_id', table_name='ai_feedback_jobs')
+    op.drop_table('ai_feedback_jobs')
@@ -0,0 +1,41 @@
+"""Keep ai_feedback_jobs rows when their entry is deleted
+
+Revision ID: 9e2c7b4a1d53
+Revises: d81f6c2b4e07
+Create Date: 2026-10-18 20:12:31.408215
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2c7b4a1d53'
+down_revision: Union[str, None] = 'd81f6c2b4e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FK_NAME = 'ai_feedback_jobs_entry_id_fkey'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ai_feedback_jobs') as batch:
+        batch.alter_column('entry_id', existing_type=sa.Integer(), nullable=True)
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint(FK_NAME, 'ai_feedback_jobs', type_='foreignkey')
+        op.create_foreign_key(
+            FK_NAME, 'ai_feedback_jobs', 'journal_entries', ['entry_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM ai_feedback_jobs WHERE entry_id IS NULL")
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint(FK_NAME, 'ai_feedback_jobs', type_='foreignkey')
+        op.create_foreign_key(
+            FK_NAME, 'ai_feedback_jobs', 'journal_entries', ['entry_id'], ['id'], ondelete='CASCADE'
+        )
+    with op.batch_alter_table('ai_feedback_jobs') as batch:
+        batch.alter_column('entry_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,39 @@
+"""Add feedback_window_start to users
+
+Revision ID: a71c4e0f5b38
+Revises: 3f6e2a0c9b17
+Create Date: 2026-10-18 19:42:07.518230
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a71c4e0f5b38'
+down_revision: Union[str, None] = '3f6e2a0c9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feedback_window_start', sa.DateTime(), nullable=True))
+
+    # Quota is now reserved when a job is queued rather than charged when it
+    # finishes, so take the units that still-active jobs will use
+    op.execute("""
+        UPDATE users SET feedback_count = feedback_count + (
+            SELECT COUNT(*) FROM ai_feedback_jobs
+            WHERE ai_feedback_jobs.user_id = users.id
+              AND ai_feedback_jobs.charge
+              AND ai_feedback_jobs.status IN ('queued', 'running')
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('feedback_window_start')
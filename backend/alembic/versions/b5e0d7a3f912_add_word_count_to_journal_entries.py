@@ -0,0 +1,47 @@
+"""Add word_count to journal_entries
+
+Revision ID: b5e0d7a3f912
+Revises: f4b3a9d2c817
+Create Date: 2026-10-18 21:48:35.207114
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e0d7a3f912'
+down_revision: Union[str, None] = 'f4b3a9d2c817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('journal_entries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+
+    # Backfill with the same whitespace split the model uses on write
+    bind = op.get_bind()
+    entries = sa.table('journal_entries', sa.column('id'), sa.column('content'), sa.column('word_count'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(entries.c.id, entries.c.content)
+            .where(entries.c.id > last_id)
+            .order_by(entries.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            entries.update().where(entries.c.id == sa.bindparam('entry_id')),
+            [{'entry_id': entry_id, 'word_count': len(content.split()) if content else 0}
+             for entry_id, content in rows]
+        )
+        last_id = rows[-1][0]
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('journal_entries', schema=None) as batch_op:
+        batch_op.drop_column('word_count')
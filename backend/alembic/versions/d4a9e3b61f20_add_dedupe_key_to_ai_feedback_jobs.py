@@ -0,0 +1,35 @@
+"""Add dedupe_key to ai_feedback_jobs
+
+Revision ID: d4a9e3b61f20
+Revises: 8c1f5a2d7e64
+Create Date: 2026-10-18 14:05:52.117630
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9e3b61f20'
+down_revision: Union[str, None] = '8c1f5a2d7e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ai_feedback_jobs', sa.Column('dedupe_key', sa.String(), nullable=True))
+    op.create_index(
+        'uq_ai_feedback_jobs_active_dedupe_key',
+        'ai_feedback_jobs',
+        ['dedupe_key'],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        sqlite_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_ai_feedback_jobs_active_dedupe_key', table_name='ai_feedback_jobs')
+    op.drop_column('ai_feedback_jobs', 'dedupe_key')
@@ -0,0 +1,36 @@
+"""Add journal_entries.updated_at and users.journal_version
+
+Revision ID: d81f6c2b4e07
+Revises: b5e0d7a3f912
+Create Date: 2026-10-18 22:31:50.118402
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f6c2b4e07'
+down_revision: Union[str, None] = 'b5e0d7a3f912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('journal_entries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('journal_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("UPDATE journal_entries SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('journal_version')
+
+    with op.batch_alter_table('journal_entries', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
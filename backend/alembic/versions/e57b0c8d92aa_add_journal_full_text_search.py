@@ -0,0 +1,70 @@
+"""Add full-text search to journal_entries
+
+Revision ID: e57b0c8d92aa
+Revises: d4a9e3b61f20
+Create Date: 2026-10-18 15:31:44.650981
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e57b0c8d92aa'
+down_revision: Union[str, None] = 'd4a9e3b61f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # Title lexemes weigh more than content lexemes when ranking
+        op.execute("""
+            ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(content, '')), 'B')
+            ) STORED
+        """)
+        op.execute("""
+            CREATE INDEX IF NOT EXISTS ix_journal_entries_search_vector
+            ON journal_entries USING GIN (search_vector)
+        """)
+    else:
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS journal_entries_fts USING fts5(
+                title, content, content='journal_entries', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ai AFTER INSERT ON journal_entries BEGIN
+                INSERT INTO journal_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ad AFTER DELETE ON journal_entries BEGIN
+                INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS journal_entries_fts_au AFTER UPDATE OF title, content ON journal_entries BEGIN
+                INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO journal_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        """)
+        op.execute("INSERT INTO journal_entries_fts(journal_entries_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_journal_entries_search_vector")
+        op.drop_column('journal_entries', 'search_vector')
+    else:
+        op.execute("DROP TRIGGER IF EXISTS journal_entries_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS journal_entries_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS journal_entries_fts_ai")
+        op.execute("DROP TABLE IF EXISTS journal_entries_fts")
@@ -0,0 +1,43 @@
+"""Add square_events table
+
+Revision ID: f4b3a9d2c817
+Revises: c29d8f14e6a0
+Create Date: 2026-10-18 21:03:12.664190
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b3a9d2c817'
+down_revision: Union[str, None] = 'c29d8f14e6a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'square_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('event_id', sa.String(), nullable=False, unique=True),
+        sa.Column('event_type', sa.String(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_square_events_id', 'square_events', ['id'])
+    op.create_index('ix_square_events_status_run_after', 'square_events', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_square_events_status_run_after', table_name='square_events')
+    op.drop_index('ix_square_events_id', table_name='square_events')
+    op.drop_table('square_events')
@@ -1,87 +1,273 @@
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from app.config import settings
 from app.database import get_db
 from app.auth_routes import get_current_user
+from app.auth_cache import CurrentUser
+from app.config import settings
+from app.schemas import FeedbackBatchRequest
 from app import models
-import openai
+from app import ai_service, auth_cache, feedback_cache, feedback_jobs, feedback_service, query_stats, quota
+import asyncio
+import json
 
 router = APIRouter()
 
-# Configure OpenAI client
-client = openai.OpenAI(api_key=settings.openai_api_key, timeout=10.0)
-
-# Request schema
-class EntryText(BaseModel):
-    text: str
 
-# AI Feedback – limited to 3 for free users, unlimited for premium
-@router.post("/ai-feedback/{entry_id}")
-def ai_feedback(
-    entry_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)
+# AI Feedback (batch) – declared before /ai-feedback/{entry_id} so "batch" isn't read as an id
+@router.post("/ai-feedback/batch")
+async def ai_feedback_batch(
+    request: FeedbackBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    # Always re-fetch the user to get the latest premium status and feedback count
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    print(f"User: {user.email}, Premium: {user.is_premium}, Feedback Count: {user.feedback_count}")
-
-    # Reset feedback_count for users who just upgraded to premium
-    if user.is_premium and user.feedback_count >= 3:
-        print(f"Resetting feedback_count for upgraded user: {user.email}")
-        user.feedback_count = 0
-        db.add(user)
+    entry_ids = list(dict.fromkeys(request.entry_ids))
+    if len(entry_ids) > settings.feedback_batch_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.feedback_batch_max_size} entries per batch"
+        )
+
+    limit = quota.limit_for(current_user)
+    charge = limit is not None
+    user_id = current_user.id
+
+    def load_entries():
+        # One query for the whole batch, then one for cache rows not in memory
+        entries = db.query(models.JournalEntry).filter(
+            models.JournalEntry.user_id == user_id,
+            models.JournalEntry.id.in_(entry_ids)
+        ).all()
+        found = {}
+        for entry in entries:
+            key = feedback_cache.cache_key(entry.title, entry.content)
+            found[entry.id] = (entry, key, entry.title, entry.content)
+        hits = feedback_cache.lookup_many(db, (key for _, key, _, _ in found.values()))
+        cached = {entry_id: hits[key] for entry_id, (_, key, _, _) in found.items() if key in hits}
+        return found, cached
+
+    found, cached = await run_in_threadpool(load_entries)
+
+    misses = [entry_id for entry_id in entry_ids if entry_id in found and entry_id not in cached]
+    allowed = misses
+    if charge and misses:
+        # Quota is reserved up front; refunds below cover failed calls
+        granted = await run_in_threadpool(quota.reserve_up_to, db, user_id, limit, len(misses))
+        allowed = misses[:granted]
+
+    gate = asyncio.Semaphore(settings.feedback_batch_concurrency)
+
+    async def generate(entry_id):
+        _, key, title, content = found[entry_id]
+        async with gate:
+            return await feedback_service.generate_once(key, title, content)
+
+    outcomes = await asyncio.gather(*(generate(entry_id) for entry_id in allowed), return_exceptions=True)
+    generated = dict(zip(allowed, outcomes))
+    failures = sum(isinstance(outcome, Exception) for outcome in outcomes)
+
+    def save_feedback():
+        for entry_id, feedback in cached.items():
+            found[entry_id][0].feedback = feedback
+        stored = []
+        for entry_id, feedback in generated.items():
+            if isinstance(feedback, Exception):
+                continue
+            entry, key, _, _ = found[entry_id]
+            entry.feedback = feedback
+            feedback_cache.store(db, key, feedback)
+            stored.append((key, feedback))
+        if charge and failures:
+            # Hand back quota reserved for calls that didn't succeed
+            quota.refund(db, user_id, failures)
         db.commit()
+        for key, feedback in stored:
+            feedback_cache.remember(key, feedback)
+        if charge and failures:
+            auth_cache.invalidate(user_id)
 
-    # Enforce 3-feedback limit for non-premium users
-    if not user.is_premium:
-        if user.feedback_count >= 3:
-            raise HTTPException(status_code=403, detail="Upgrade to Premium. Free AI feedback limit reached (3/3)")
+    await run_in_threadpool(save_feedback)
 
-    entry = (
-        db.query(models.JournalEntry)
-        .filter(
-            models.JournalEntry.id == entry_id,
-            models.JournalEntry.user_id == user.id,
-        )
-        .first()
+    results = []
+    for entry_id in entry_ids:
+        if entry_id not in found:
+            results.append({"entry_id": entry_id, "status_code": 404, "error": "Journal entry not found"})
+        elif entry_id in cached:
+            results.append({"entry_id": entry_id, "status_code": 200, "feedback": cached[entry_id], "cached": True})
+        elif entry_id not in generated:
+            results.append({"entry_id": entry_id, "status_code": 403, "error": quota.exceeded(limit).detail})
+        elif isinstance(generated[entry_id], asyncio.TimeoutError):
+            results.append({"entry_id": entry_id, "status_code": 504, "error": "AI feedback timed out"})
+        elif isinstance(generated[entry_id], Exception):
+            results.append({"entry_id": entry_id, "status_code": 502, "error": str(generated[entry_id])})
+        else:
+            results.append({"entry_id": entry_id, "status_code": 200, "feedback": generated[entry_id], "cached": False})
+
+    return {"results": results}
+
+
+# AI Feedback – limited per plan (3 for free users, unlimited for premium by default)
+@router.post("/ai-feedback/{entry_id}", dependencies=[Depends(query_stats.budget(6))])
+async def ai_feedback(
+    entry_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)
+):
+    entry = await run_in_threadpool(feedback_service.get_entry, db, entry_id, current_user.id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Journal entry not found")
+
+    # Unchanged entries are served from the cache without touching the quota
+    key = feedback_cache.cache_key(entry.title, entry.content)
+    cached = await run_in_threadpool(feedback_service.apply_cached, db, entry, key)
+    if cached is not None:
+        return {"feedback": cached}
+
+    # The OpenAI round trip happens in a worker; clients poll the job.
+    # Repeat clicks while a job is active join it instead of queueing
+    # another, and only a new job reserves quota.
+    job_id, status = await run_in_threadpool(
+        feedback_service.enqueue_or_join, db, current_user.id, entry_id, key, quota.limit_for(current_user)
+    )
+    feedback_jobs.notify()
+
+    status_url = f"/ai-feedback/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": status, "status_url": status_url},
+        headers={"Location": status_url},
     )
 
+
+# AI Feedback job status
+@router.get("/ai-feedback/jobs/{job_id}")
+def get_feedback_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    job = db.query(models.FeedbackJob).filter(
+        models.FeedbackJob.id == job_id,
+        models.FeedbackJob.user_id == current_user.id
+    ).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Feedback job not found")
+
+    return {
+        "job_id": job.id,
+        "entry_id": job.entry_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "feedback": job.feedback,
+        "error": job.error if job.status == feedback_jobs.FAILED else None,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
+
+
+# AI Feedback streamed as Server-Sent Events
+def _sse(data: dict, event: str = None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+# Keeps detached stream work alive until it finishes
+_detached = set()
+
+
+def _detach(fn, *args):
+    # Runs `fn` in the threadpool to completion even if the stream awaiting
+    # it is cancelled by a disconnect
+    future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    _detached.add(future)
+    future.add_done_callback(_detached.discard)
+    return future
+
+
+def _settle_quota(user_id: int, reserved, saving):
+    # Hands the reserved unit back unless the feedback was saved. Decided
+    # from the futures once they finish, so a cancel at any await can
+    # neither keep a unit for nothing nor refund a saved answer.
+    def succeeded(future):
+        return not future.cancelled() and future.exception() is None and future.result()
+
+    def after_save(future):
+        if not succeeded(future):
+            quota.refund_later(user_id)
+
+    def after_reserve(future):
+        if not succeeded(future):
+            return
+        if saving is None:
+            quota.refund_later(user_id)
+        else:
+            saving.add_done_callback(after_save)
+
+    reserved.add_done_callback(after_reserve)
+
+
+@router.post("/ai-feedback/{entry_id}/stream")
+async def ai_feedback_stream(
+    entry_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    entry = await run_in_threadpool(feedback_service.get_entry, db, entry_id, current_user.id)
     if not entry:
         raise HTTPException(status_code=404, detail="Journal entry not found")
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a supportive, kind journaling coach.",
-                },
-                {
-                    "role": "user",
-                    "content": f"Give uplifting feedback on this entry titled '{entry.title}':\n\n{entry.content}",
-                },
-            ],
-            max_tokens=150,
-        )
+    key = feedback_cache.cache_key(entry.title, entry.content)
+    cached = await run_in_threadpool(feedback_service.apply_cached, db, entry, key)
+    if cached is not None:
+        async def cached_stream():
+            yield _sse({"delta": cached})
+            yield _sse({"feedback": cached}, event="done")
 
-        feedback = response.choices[0].message.content
-        entry.feedback = feedback
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
 
-        # Only increment for free users
-        if not user.is_premium:
-            print(f"Updating feedback_count for: {user.email}")
-            user.feedback_count += 1
-            db.add(user)
-            print(f"Set feedback_count to: {user.feedback_count}")
+    title, content, user_id = entry.title, entry.content, current_user.id
+    limit = quota.limit_for(current_user)
 
-        db.commit()
-        print("Commit completed")
-        db.refresh(entry)
+    async def event_stream():
+        # Quota is reserved in here rather than before responding: a client
+        # that leaves before the body is read never starts this generator,
+        # so is never charged
+        reserved = saving = None
+        try:
+            if limit is not None:
+                reserved = _detach(quota.reserve_now, user_id, limit)
+                if await asyncio.shield(reserved) is None:
+                    yield _sse({"detail": quota.exceeded(limit).detail}, event="error")
+                    return
+
+            parts = []
+            try:
+                async for delta in ai_service.stream_feedback(title, content):
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+            except asyncio.TimeoutError:
+                yield _sse({"detail": "AI feedback timed out"}, event="error")
+                return
+            except Exception as e:
+                yield _sse({"detail": str(e)}, event="error")
+                return
 
-        return {"feedback": feedback}
+            # Only reached when the upstream stream finished. A client
+            # disconnect cancels this generator before here.
+            feedback = "".join(parts)
+            saving = _detach(feedback_service.save_feedback, entry_id, user_id, feedback, key)
+            if not await asyncio.shield(saving):
+                yield _sse({"detail": "Journal entry not found"}, event="error")
+                return
 
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+            yield _sse({"feedback": feedback}, event="done")
+        finally:
+            # Errors and disconnects give the reserved unit back
+            if reserved is not None:
+                _settle_quota(user_id, reserved, saving)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,116 @@
+# app/ai_service.py
+
+import asyncio
+import time
+import httpx
+import openai
+from app import metrics
+from app.config import settings
+
+MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a supportive, kind journaling coach."
+MAX_TOKENS = 150
+
+# One pooled HTTP client shared by every feedback call in this process,
+# so keep-alive connections to OpenAI are reused instead of re-opened.
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_connections,
+    ),
+    timeout=httpx.Timeout(settings.openai_timeout_seconds, connect=5.0),
+)
+
+client = openai.AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    base_url=settings.openai_base_url,
+    http_client=http_client,
+    timeout=settings.openai_timeout_seconds,
+    max_retries=0,
+)
+
+# Caps how many completions this process has in flight upstream at once.
+# Callers beyond the cap wait here instead of piling onto OpenAI.
+upstream_gate = asyncio.Semaphore(settings.openai_max_concurrency)
+
+
+def build_messages(title: str, content: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Give uplifting feedback on this entry titled '{title}':\n\n{content}"},
+    ]
+
+
+async def _acquire_gate():
+    waiting = time.perf_counter()
+    await upstream_gate.acquire()
+    metrics.openai_gate_wait.observe((), time.perf_counter() - waiting)
+
+
+async def _complete(title: str, content: str) -> str:
+    await _acquire_gate()
+    try:
+        async with metrics.upstream("openai", "chat.completions"):
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=build_messages(title, content),
+                max_tokens=MAX_TOKENS,
+            )
+    finally:
+        upstream_gate.release()
+    metrics.record_usage(MODEL, response.usage)
+    return response.choices[0].message.content
+
+
+async def generate_feedback(title: str, content: str) -> str:
+    # The deadline covers time spent waiting for the gate as well as the
+    # upstream call itself, so a saturated gate can't hold a request forever.
+    return await asyncio.wait_for(
+        _complete(title, content), timeout=settings.openai_timeout_seconds
+    )
+
+
+async def _open_stream(title: str, content: str):
+    # Takes a gate slot and opens the stream; the slot is handed back if
+    # opening fails, otherwise the caller releases it when the stream ends
+    await _acquire_gate()
+    try:
+        return await client.chat.completions.create(
+            model=MODEL,
+            messages=build_messages(title, content),
+            max_tokens=MAX_TOKENS,
+            stream=True,
+            # The last chunk then carries token usage and no choices
+            stream_options={"include_usage": True},
+        )
+    except BaseException:
+        upstream_gate.release()
+        raise
+
+
+async def stream_feedback(title: str, content: str):
+    # Yields text deltas as OpenAI produces them. As in generate_feedback,
+    # the deadline covers waiting for the gate as well as opening the
+    # stream (so the upstream timing includes any gate wait); gaps between
+    # chunks are bounded by the client's read timeout.
+    async with metrics.upstream("openai", "chat.completions.stream"):
+        stream = await asyncio.wait_for(
+            _open_stream(title, content), timeout=settings.openai_timeout_seconds
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    metrics.record_usage(MODEL, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Drop the upstream connection if our caller stopped early
+            await stream.close()
+            upstream_gate.release()
+
+
+async def aclose():
+    await http_client.aclose()
@@ -0,0 +1,123 @@
+# app/auth_cache.py
+# Short-lived, in-process cache behind get_current_user: verified token
+# claims and a read-only snapshot of the user row. Writes to is_premium,
+# feedback_count or the password call invalidate(); writes made in another
+# process (e.g. worker.py) show up here within AUTH_CACHE_TTL_SECONDS.
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from app import models
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: str
+    is_premium: bool
+    feedback_count: int
+
+
+class _TTLCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_values(self, value):
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if v == value]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+tokens = _TTLCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+users = _TTLCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+
+# Bumped by invalidate() so a load that raced with a write isn't cached
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def _generation(user_id: int) -> int:
+    with _generations_lock:
+        return _generations.get(user_id, 0)
+
+
+def snapshot(user: models.User) -> CurrentUser:
+    return CurrentUser(
+        id=user.id,
+        email=user.email,
+        is_premium=bool(user.is_premium),
+        feedback_count=user.feedback_count or 0,
+    )
+
+
+def user_id_for_token(token: str) -> Optional[int]:
+    return tokens.get(token)
+
+
+def remember_token(token: str, user_id: int, expires_at: Optional[float]):
+    # Never outlive the token's own exp claim
+    ttl = None if expires_at is None else expires_at - time.time()
+    tokens.set(token, user_id, ttl)
+
+
+def get_user(user_id: int) -> Optional[CurrentUser]:
+    return users.get(user_id)
+
+
+async def load_user(user_id: int) -> Optional[CurrentUser]:
+    generation = _generation(user_id)
+    async with AsyncSessionLocal() as db:
+        user = await db.get(models.User, user_id)
+        if user is None:
+            return None
+        current = snapshot(user)
+
+    if _generation(user_id) == generation:
+        users.set(user_id, current)
+    return current
+
+
+def invalidate(user_id: int, tokens_too: bool = False):
+    # Call after the write has committed
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+    users.pop(user_id)
+    if tokens_too:
+        tokens.discard_values(user_id)
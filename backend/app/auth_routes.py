@@ -1,20 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from app.database import get_db
-from app import models
+from app.database import get_async_db
+from app import auth_cache, email_outbox, models, password_hashing
 from app.schemas import UserCreate, UserOut, Token
 from app.config import settings
-from app.utils.email import send_reset_email
+from app.utils.email import queue_reset_email
 from uuid import uuid4
 
 auth_router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
@@ -22,17 +20,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-# Hash Utilities
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-def verify_password(plain_password, hashed_password):
-    try:
-        return pwd_context.verify(plain_password.strip(), hashed_password.strip())
-    except Exception:
-        return False
-
-
 # Create Token
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -42,89 +29,112 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 
 # Get Current User
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Never blocks the event loop: verified claims and the user snapshot come
+# from auth_cache, and a miss loads the user over the async engine.
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> auth_cache.CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
+    user_id = auth_cache.user_id_for_token(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id: int = payload.get("user_id")
+            if user_id is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        auth_cache.remember_token(token, user_id, payload.get("exp"))
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        user = await auth_cache.load_user(user_id)
     if user is None:
         raise credentials_exception
 
     return user
 
 
+async def _authenticate(db: AsyncSession, db_user: models.User, password: str) -> bool:
+    # bcrypt runs in password_hashing's process pool
+    if not db_user:
+        return False
+    valid, new_hash = await password_hashing.verify_password(password, db_user.hashed_password)
+    if valid and new_hash:
+        # Stored hash predates the current BCRYPT_ROUNDS
+        db_user.hashed_password = new_hash
+        await db.commit()
+    return valid
+
+
+def _issue_token(db_user: models.User):
+    # Long-lived token for AI user
+    if db_user.email == "gpt3@nightingale.ai":
+        return create_access_token(data={"user_id": db_user.id}, expires_delta=timedelta(days=90))
+    return create_access_token(data={"user_id": db_user.id})
+
+
 # Register
 @auth_router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(
+        select(models.User).where(models.User.email == user.email)
+    )).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await password_hashing.hash_password(user.password)
     new_user = models.User(email=user.email.strip(), hashed_password=hashed_pw)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 # OAuth2 Login
 @auth_router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email.ilike(form_data.username.strip())).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(
+        select(models.User).where(models.User.email.ilike(form_data.username.strip()))
+    )).scalars().first()
 
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+    if not await _authenticate(db, db_user, form_data.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # Long-lived token for AI user
-    if db_user.email == "gpt3@nightingale.ai":
-        token = create_access_token(data={"user_id": db_user.id}, expires_delta=timedelta(days=90))
-    else:
-        token = create_access_token(data={"user_id": db_user.id})
-
-    return {"access_token": token, "token_type": "bearer"}
+    return {"access_token": _issue_token(db_user), "token_type": "bearer"}
 
 
 # JSON Login (Non-Form)
 @auth_router.post("/login-json", response_model=Token)
-def login_json(data: dict = Body(...), db: Session = Depends(get_db)):
+async def login_json(data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     username = data.get("username")
     password = data.get("password")
 
     if not username or not password:
         raise HTTPException(status_code=400, detail="Missing username or password")
 
-    db_user = db.query(models.User).filter(models.User.email == username.strip()).first()
+    db_user = (await db.execute(
+        select(models.User).where(models.User.email == username.strip())
+    )).scalars().first()
 
-    if not db_user or not verify_password(password, db_user.hashed_password):
+    if not await _authenticate(db, db_user, password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if db_user.email == "gpt3@nightingale.ai":
-        token = create_access_token(data={"user_id": db_user.id}, expires_delta=timedelta(days=90))
-    else:
-        token = create_access_token(data={"user_id": db_user.id})
-
-    return {"access_token": token, "token_type": "bearer"}
+    return {"access_token": _issue_token(db_user), "token_type": "bearer"}
 
 
 # Forgot Password
 @auth_router.post("/forgot-password")
-def forgot_password(data: dict = Body(...), db: Session = Depends(get_db)):
+async def forgot_password(data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     email = data.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
 
-    user = db.query(models.User).filter(models.User.email == email.strip()).first()
+    user = (await db.execute(
+        select(models.User).where(models.User.email == email.strip())
+    )).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="No user found with this email")
 
@@ -137,34 +147,35 @@ def forgot_password(data: dict = Body(...), db: Session = Depends(get_db)):
         expires_at=expires_at
     )
     db.add(db_token)
-    db.commit()
-
-    send_reset_email(user.email, token)
+    # Token and outgoing email commit together; the outbox dispatcher sends it
+    queue_reset_email(db, user.email, token)
+    await db.commit()
+    email_outbox.notify()
 
     return {"message": "Reset email sent"}
 
 
 # === Reset Password ===
 @auth_router.post("/reset-password")
-def reset_password(
+async def reset_password(
     token: str = Body(...),
     new_password: str = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_token = db.query(models.PasswordResetToken).filter(models.PasswordResetToken.token == token).first()
+    db_token = (await db.execute(
+        select(models.PasswordResetToken).where(models.PasswordResetToken.token == token)
+    )).scalars().first()
 
     if not db_token or db_token.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = db.query(models.User).filter(models.User.id == db_token.user_id).first()
+    user = await db.get(models.User, db_token.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed_pw = pwd_context.hash(new_password.strip())
-    user.hashed_password = hashed_pw
-    db.commit()
-
-    db.delete(db_token)
-    db.commit()
+    user.hashed_password = await password_hashing.hash_password(new_password.strip())
+    await db.delete(db_token)
+    await db.commit()
+    auth_cache.invalidate(user.id, tokens_too=True)
 
     return {"message": "Password has been reset"}
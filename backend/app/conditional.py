@@ -0,0 +1,52 @@
+# app/conditional.py
+# Conditional GET helpers: strong ETags, If-None-Match / If-Modified-Since
+# checks and bodiless 304 responses.
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag(*parts) -> str:
+    raw = "\x1f".join(str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def requested(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_fresh(request: Request, tag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True when the client's copy matches; If-None-Match wins over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [value.strip() for value in if_none_match.split(",")]
+        return "*" in tags or any(value.removeprefix("W/") == tag for value in tags)
+
+    since = request.headers.get("if-modified-since")
+    if since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates only carry whole seconds
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    return False
+
+
+def headers(tag: str, last_modified: Optional[datetime] = None) -> dict:
+    values = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        values["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return values
+
+
+def not_modified(tag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=headers(tag, last_modified))
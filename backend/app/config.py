@@ -2,15 +2,83 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 class Settings(BaseSettings):
     database_url: str = Field(..., alias="DATABASE_URL")
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(30.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    # Recycle before Render's Postgres proxy drops idle connections
+    db_pool_recycle_seconds: int = Field(1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    internal_token: Optional[str] = Field(None, alias="INTERNAL_TOKEN")
     secret_key: str = Field(..., alias="SECRET_KEY")
     algorithm: str = Field("HS256", alias="ALGORITHM")
     access_token_expire_minutes: int = Field(30, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    bcrypt_rounds: int = Field(12, alias="BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(32, alias="PASSWORD_HASH_MAX_PENDING")
+    password_hash_retry_after_seconds: int = Field(1, alias="PASSWORD_HASH_RETRY_AFTER_SECONDS")
     openai_api_key: str = Field(..., alias="OPENAI_API_KEY")
+    # Point at an OpenAI-compatible server instead (e.g. the benchmark fakes)
+    openai_base_url: Optional[str] = Field(None, alias="OPENAI_BASE_URL")
+    openai_timeout_seconds: float = Field(15.0, alias="OPENAI_TIMEOUT_SECONDS")
+    openai_max_concurrency: int = Field(8, alias="OPENAI_MAX_CONCURRENCY")
+    openai_max_connections: int = Field(20, alias="OPENAI_MAX_CONNECTIONS")
+    # Per-plan AI feedback limits; a negative limit means unlimited
+    feedback_limit_free: int = Field(3, alias="FEEDBACK_LIMIT_FREE")
+    feedback_limit_premium: int = Field(-1, alias="FEEDBACK_LIMIT_PREMIUM")
+    # Quota resets this many days after a window starts; 0 never resets
+    feedback_quota_window_days: float = Field(0, alias="FEEDBACK_QUOTA_WINDOW_DAYS")
+    feedback_cache_memory_size: int = Field(1024, alias="FEEDBACK_CACHE_MEMORY_SIZE")
+    feedback_cache_max_rows: int = Field(10000, alias="FEEDBACK_CACHE_MAX_ROWS")
+    feedback_batch_max_size: int = Field(100, alias="FEEDBACK_BATCH_MAX_SIZE")
+    feedback_batch_concurrency: int = Field(8, alias="FEEDBACK_BATCH_CONCURRENCY")
+    feedback_workers: int = Field(2, alias="FEEDBACK_WORKERS")
+    feedback_job_max_attempts: int = Field(5, alias="FEEDBACK_JOB_MAX_ATTEMPTS")
+    feedback_job_backoff_seconds: float = Field(2.0, alias="FEEDBACK_JOB_BACKOFF_SECONDS")
+    feedback_job_backoff_max_seconds: float = Field(60.0, alias="FEEDBACK_JOB_BACKOFF_MAX_SECONDS")
+    feedback_job_poll_seconds: float = Field(1.0, alias="FEEDBACK_JOB_POLL_SECONDS")
+    feedback_job_lease_seconds: int = Field(120, alias="FEEDBACK_JOB_LEASE_SECONDS")
+    auth_cache_ttl_seconds: float = Field(30.0, alias="AUTH_CACHE_TTL_SECONDS")
+    auth_cache_max_entries: int = Field(10000, alias="AUTH_CACHE_MAX_ENTRIES")
     sendgrid_api_key: str = Field(..., alias="SENDGRID_API_KEY")
     sendgrid_from_email: str = Field(..., alias="SENDGRID_FROM_EMAIL")
+    sendgrid_api_url: str = Field("https://api.sendgrid.com/v3/mail/send", alias="SENDGRID_API_URL")
+    # sendgrid, memory (kept in-process) or file (JSON lines at EMAIL_OUTBOX_FILE)
+    email_transport: str = Field("sendgrid", pattern="^(sendgrid|memory|file)$", alias="EMAIL_TRANSPORT")
+    email_outbox_file: str = Field("email_outbox.jsonl", alias="EMAIL_OUTBOX_FILE")
+    email_timeout_seconds: float = Field(10.0, alias="EMAIL_TIMEOUT_SECONDS")
+    email_workers: int = Field(1, alias="EMAIL_WORKERS")
+    email_batch_size: int = Field(50, alias="EMAIL_BATCH_SIZE")
+    email_max_attempts: int = Field(8, alias="EMAIL_MAX_ATTEMPTS")
+    email_backoff_seconds: float = Field(5.0, alias="EMAIL_BACKOFF_SECONDS")
+    email_backoff_max_seconds: float = Field(600.0, alias="EMAIL_BACKOFF_MAX_SECONDS")
+    email_poll_seconds: float = Field(2.0, alias="EMAIL_POLL_SECONDS")
+    email_lease_seconds: int = Field(120, alias="EMAIL_LEASE_SECONDS")
+    square_event_workers: int = Field(1, alias="SQUARE_EVENT_WORKERS")
+    square_event_max_attempts: int = Field(5, alias="SQUARE_EVENT_MAX_ATTEMPTS")
+    square_event_backoff_seconds: float = Field(5.0, alias="SQUARE_EVENT_BACKOFF_SECONDS")
+    square_event_poll_seconds: float = Field(2.0, alias="SQUARE_EVENT_POLL_SECONDS")
+    square_event_lease_seconds: int = Field(60, alias="SQUARE_EVENT_LEASE_SECONDS")
+
+    # SQL accounting (app/query_stats.py): statements slower than this are
+    # logged, the same statement this many times in one request is flagged
+    # as a possible N+1, and X-Query-Count / Server-Timing headers are opt-in
+    slow_query_ms: float = Field(200, alias="SLOW_QUERY_MS")
+    n_plus_one_threshold: int = Field(5, alias="N_PLUS_ONE_THRESHOLD")
+    query_stats_headers: bool = Field(False, alias="QUERY_STATS_HEADERS")
+
+    # Journal export: rows fetched per round trip from the server-side cursor
+    export_batch_size: int = Field(1000, alias="EXPORT_BATCH_SIZE")
+    # Bulk writes: entries per POST/DELETE /journal/bulk, and rows per
+    # INSERT batch and in total for an NDJSON import
+    journal_bulk_max_entries: int = Field(1000, alias="JOURNAL_BULK_MAX_ENTRIES")
+    import_batch_size: int = Field(1000, alias="IMPORT_BATCH_SIZE")
+    import_max_entries: int = Field(1000000, alias="IMPORT_MAX_ENTRIES")
+    # Longest NDJSON line the import buffers while waiting for its newline
+    import_max_line_bytes: int = Field(1048576, alias="IMPORT_MAX_LINE_BYTES")
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings  
+from app import pool_stats, query_stats
 
 # Log the DB URL (optional for debugging)
 print("DATABASE_URL loaded:", settings.database_url)
@@ -10,11 +13,42 @@ print("DATABASE_URL loaded:", settings.database_url)
 DATABASE_URL = settings.database_url
 
 # Set up SQLAlchemy engine and session
-engine = create_engine(DATABASE_URL)
+engine = query_stats.instrument(pool_stats.instrument(
+    create_engine(DATABASE_URL, **pool_stats.engine_options(DATABASE_URL, pool_stats.sync_stats)),
+    pool_stats.sync_stats,
+))
 print("REAL DB CONNECTED TO:", engine.url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Async driver for the same database: asyncpg for Postgres, aiosqlite for SQLite.
+# Request handlers use this; workers, migrations and startup DDL stay sync.
+def async_url(url: str):
+    url = make_url(url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+asyncpg")
+        # asyncpg takes `ssl`, not libpq's `sslmode`
+        if "sslmode" in url.query:
+            url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    elif url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+ASYNC_DATABASE_URL = async_url(DATABASE_URL)
+async_engine = query_stats.instrument(pool_stats.instrument(
+    create_async_engine(
+        ASYNC_DATABASE_URL,
+        **pool_stats.engine_options(ASYNC_DATABASE_URL, pool_stats.async_stats, is_async=True)
+    ),
+    pool_stats.async_stats,
+))
+
+# Objects stay usable after commit without a lazy refresh, which can't run
+# implicitly on an async session
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -25,3 +59,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async dependency to get a DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
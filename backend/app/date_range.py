@@ -0,0 +1,82 @@
+# app/date_range.py
+# Turns user-facing date filters into half-open [start, end) bounds on
+# created_at, which is stored as naive UTC. Comparing the raw column keeps
+# the predicate sargable, so the (user_id, created_at) index is used.
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import HTTPException
+from app import models
+
+
+def _zone(tz: Optional[str]):
+    if not tz:
+        return timezone.utc
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+
+
+def _to_utc(value: datetime, zone) -> datetime:
+    # Naive datetimes are read in the caller's zone; explicit offsets win
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=zone)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse(value: str, name: str):
+    # Returns (datetime, is_whole_day)
+    try:
+        if len(value) == 10:
+            return datetime.combine(date.fromisoformat(value), time.min), True
+        return datetime.fromisoformat(value.replace("Z", "+00:00")), False
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid '{name}': use YYYY-MM-DD or an ISO 8601 datetime"
+        )
+
+
+def resolve(date_from: Optional[str] = None, date_to: Optional[str] = None,
+            on: Optional[str] = None, tz: Optional[str] = None):
+    """Return naive-UTC (start, end) bounds; either may be None.
+
+    `from` is inclusive. A date-only `to` includes that whole day, while a
+    datetime `to` is exclusive. `on` is shorthand for one whole day.
+    """
+    zone = _zone(tz)
+    start = end = None
+
+    if on:
+        day, _ = _parse(on, "date")
+        day = datetime.combine(day.date(), time.min)
+        start = _to_utc(day, zone)
+        end = _to_utc(day + timedelta(days=1), zone)
+
+    if date_from:
+        value, _ = _parse(date_from, "from")
+        value = _to_utc(value, zone)
+        start = value if start is None else max(start, value)
+
+    if date_to:
+        value, whole_day = _parse(date_to, "to")
+        if whole_day:
+            value = value + timedelta(days=1)
+        value = _to_utc(value, zone)
+        end = value if end is None else min(end, value)
+
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    return start, end
+
+
+def created_at_filters(start: Optional[datetime], end: Optional[datetime]):
+    filters = []
+    if start is not None:
+        filters.append(models.JournalEntry.created_at >= start)
+    if end is not None:
+        filters.append(models.JournalEntry.created_at < end)
+    return filters
@@ -0,0 +1,186 @@
+# app/email_outbox.py
+# Sends queued rows from the email_outbox table. Rows are claimed in
+# batches the same way app/feedback_jobs.py claims jobs, sent through the
+# configured transport, and retried with backoff on transient failures.
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.utils import email
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+Outbox = models.EmailOutbox
+
+# Set when this process queues an email so an idle dispatcher skips the
+# rest of its poll interval
+_wakeup = asyncio.Event()
+
+
+def notify():
+    _wakeup.set()
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=settings.email_lease_seconds)
+    return or_(
+        and_(Outbox.status == PENDING, Outbox.run_after <= now),
+        and_(Outbox.status == SENDING, Outbox.locked_at < stale),
+    )
+
+
+def claim_batch(db: Session, limit: int) -> List[email.Message]:
+    now = datetime.utcnow()
+
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(
+            select(Outbox)
+            .where(_claimable(now))
+            .order_by(Outbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        for row in rows:
+            row.status = SENDING
+            row.locked_at = now
+            row.attempts += 1
+        messages = [email.Message(r.id, r.to_email, r.subject, r.html_content) for r in rows]
+        db.commit()
+        return messages
+
+    # SQLite: compare-and-set UPDATE ... RETURNING keeps only the rows this
+    # dispatcher actually won
+    ids = db.execute(
+        select(Outbox.id).where(_claimable(now)).order_by(Outbox.id).limit(limit)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return []
+
+    rows = db.execute(
+        update(Outbox)
+        .where(Outbox.id.in_(ids), _claimable(now))
+        .values(status=SENDING, locked_at=now, attempts=Outbox.attempts + 1)
+        .returning(Outbox.id, Outbox.to_email, Outbox.subject, Outbox.html_content)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted((email.Message(*row) for row in rows), key=lambda m: m.id)
+
+
+def _claim_next() -> List[email.Message]:
+    db = SessionLocal()
+    try:
+        return claim_batch(db, settings.email_batch_size)
+    finally:
+        db.close()
+
+
+def retry_delay(exc: Exception, attempts: int) -> Optional[float]:
+    # Throttling, SendGrid 5xx and network trouble are retried; other
+    # rejections (bad address, bad key) fail the row straight away
+    retry_after = None
+    if isinstance(exc, email.EmailSendError):
+        if exc.status_code != 429 and exc.status_code < 500:
+            return None
+        retry_after = exc.retry_after
+    elif not isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return None
+    if attempts >= settings.email_max_attempts:
+        return None
+
+    delay = min(
+        settings.email_backoff_seconds * 2 ** max(attempts - 1, 0),
+        settings.email_backoff_max_seconds,
+    )
+    delay = random.uniform(delay / 2, delay)
+    try:
+        delay = max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+
+def _finish(messages: List[email.Message], errors: List[Optional[Exception]]):
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        rows = {
+            row.id: row
+            for row in db.query(Outbox).filter(Outbox.id.in_([m.id for m in messages]))
+        }
+        for message, error in zip(messages, errors):
+            row = rows.get(message.id)
+            if row is None:
+                continue
+            row.locked_at = None
+            if error is None:
+                row.status = SENT
+                row.sent_at = now
+                row.error = None
+                continue
+
+            row.error = str(error) or type(error).__name__
+            delay = retry_delay(error, row.attempts)
+            if delay is None:
+                row.status = FAILED
+                print(f"Email {row.id} to {row.to_email} failed: {row.error}")
+            else:
+                row.status = PENDING
+                row.run_after = now + timedelta(seconds=delay)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def send_batch(messages: List[email.Message]):
+    try:
+        errors = await email.get_transport().send_many(messages)
+    except Exception as e:
+        errors = [e] * len(messages)
+    await run_in_threadpool(_finish, messages, errors)
+
+
+async def dispatcher(name: str):
+    while True:
+        try:
+            messages = await run_in_threadpool(_claim_next)
+        except Exception as e:
+            print(f"Email dispatcher {name} could not claim emails: {e}")
+            messages = []
+
+        if not messages:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.email_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+
+        try:
+            await send_batch(messages)
+        except Exception as e:
+            # Rows stay 'sending' and are re-claimed once their lease lapses
+            print(f"Email dispatcher {name} crashed on a batch: {e}")
+
+
+def start_dispatchers(count: int):
+    return [asyncio.create_task(dispatcher(f"e{i}")) for i in range(count)]
+
+
+async def stop_dispatchers(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await email.aclose()
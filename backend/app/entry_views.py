@@ -0,0 +1,54 @@
+# app/entry_views.py
+# Column projections for journal listings. `?view=summary` or `?fields=`
+# selects only the listed columns; preview and word_count are computed in
+# SQL (word_count is stored on write), so the full content and feedback
+# text never leave the database.
+
+from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import Text, case, func
+from app import models
+
+Entry = models.JournalEntry
+
+PREVIEW_CHARS = 200
+
+SUMMARY_FIELDS = ["id", "title", "created_at", "preview", "word_count", "has_feedback"]
+
+# id and created_at are always selected: they key each row and the cursor
+REQUIRED_FIELDS = ["id", "created_at"]
+
+
+def parse_fields(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Return the projected field names, or None for full entries."""
+    if not fields:
+        return list(SUMMARY_FIELDS) if view == "summary" else None
+
+    wanted = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in wanted if name not in SUMMARY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(SUMMARY_FIELDS)}"
+        )
+    return [name for name in SUMMARY_FIELDS if name in REQUIRED_FIELDS or name in wanted]
+
+
+def _preview():
+    return case(
+        (func.length(func.substr(Entry.content, 1, PREVIEW_CHARS + 1)) > PREVIEW_CHARS,
+         func.substr(Entry.content, 1, PREVIEW_CHARS, type_=Text) + "…"),
+        else_=Entry.content,
+    )
+
+
+def columns(names: List[str]):
+    expressions = {
+        "id": lambda: Entry.id,
+        "title": lambda: Entry.title,
+        "created_at": lambda: Entry.created_at,
+        "preview": _preview,
+        "word_count": lambda: Entry.word_count,
+        "has_feedback": lambda: Entry.feedback.is_not(None),
+    }
+    return [expressions[name]().label(name) for name in names]
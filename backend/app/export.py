@@ -0,0 +1,88 @@
+# app/export.py
+# Streams a user's whole journal as NDJSON or CSV. Rows come from a
+# server-side cursor in batches of EXPORT_BATCH_SIZE and are encoded one
+# batch at a time, so memory stays flat however large the journal is.
+
+import csv
+import io
+import zlib
+from datetime import datetime
+import orjson
+from sqlalchemy import select
+from app import models
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.responses import ORJSON_OPTIONS
+
+Entry = models.JournalEntry
+
+FIELDS = ["id", "title", "content", "feedback", "created_at", "updated_at"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(dict(row._mapping), option=ORJSON_OPTIONS) + b"\n" for row in rows)
+
+
+# Cells starting with these run as formulas when the CSV is opened in a
+# spreadsheet; NDJSON is left as is so it imports back unchanged
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _encoded(user_id: int, fmt: str):
+    # The request's session is closed before a streamed body is sent, so
+    # the export holds its own for as long as it runs
+    query = (
+        select(*(getattr(Entry, name) for name in FIELDS))
+        .where(Entry.user_id == user_id)
+        .order_by(Entry.created_at, Entry.id)
+        .execution_options(yield_per=settings.export_batch_size)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        first = True
+        async for rows in result.partitions():
+            yield _ndjson(rows) if fmt == "ndjson" else _csv(rows, header=first)
+            first = False
+        if first and fmt == "csv":
+            yield _csv([], header=True)
+
+
+async def stream(user_id: int, fmt: str, gzip: bool = False):
+    if not gzip:
+        async for chunk in _encoded(user_id, fmt):
+            yield chunk
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in _encoded(user_id, fmt):
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def filename(fmt: str, gzip: bool) -> str:
+    name = f"nightingale-journal-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return name + ".gz" if gzip else name
@@ -0,0 +1,142 @@
+# app/feedback_cache.py
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app import models
+from app.ai_service import MODEL, MAX_TOKENS, build_messages
+from app.config import settings
+
+# Prune the durable tier once every this many writes rather than on each one
+PRUNE_EVERY = 100
+
+
+def cache_key(title: str, content: str) -> str:
+    # Hash exactly what would be sent upstream: model, system prompt,
+    # rendered user prompt and max_tokens. Any edit to the entry, or to the
+    # prompt itself, produces a new key.
+    payload = json.dumps(
+        [MODEL, build_messages(title, content), MAX_TOKENS],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _LRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+memory = _LRU(settings.feedback_cache_memory_size)
+_writes = 0
+
+
+def lookup_memory(key: str):
+    # Event-loop safe: no I/O
+    return memory.get(key)
+
+
+def lookup(db: Session, key: str):
+    feedback = memory.get(key)
+    if feedback is not None:
+        return feedback
+
+    row = db.get(models.FeedbackCache, key)
+    if row is None:
+        return None
+
+    row.last_hit_at = datetime.utcnow()
+    memory.set(key, row.feedback)
+    return row.feedback
+
+
+def lookup_many(db: Session, keys: Iterable[str]) -> Dict[str, str]:
+    # Memory first, then one query for the rest; only keys with feedback
+    # are in the result
+    found, missing = {}, []
+    for key in dict.fromkeys(keys):
+        feedback = memory.get(key)
+        if feedback is None:
+            missing.append(key)
+        else:
+            found[key] = feedback
+    if not missing:
+        return found
+
+    rows = db.execute(
+        select(models.FeedbackCache.key, models.FeedbackCache.feedback)
+        .where(models.FeedbackCache.key.in_(missing))
+    ).all()
+    if rows:
+        db.execute(
+            update(models.FeedbackCache)
+            .where(models.FeedbackCache.key.in_([key for key, _ in rows]))
+            .values(last_hit_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    for key, feedback in rows:
+        memory.set(key, feedback)
+        found[key] = feedback
+    return found
+
+
+def store(db: Session, key: str, feedback: str):
+    # Joins the caller's transaction; the caller commits, then calls
+    # remember() so the memory tier never holds a row that rolled back
+    global _writes
+
+    row = db.get(models.FeedbackCache, key)
+    if row is None:
+        db.add(models.FeedbackCache(key=key, feedback=feedback))
+    else:
+        row.feedback = feedback
+        row.last_hit_at = datetime.utcnow()
+
+    _writes += 1
+    if _writes % PRUNE_EVERY == 0:
+        prune(db)
+
+
+def remember(key: str, feedback: str):
+    memory.set(key, feedback)
+
+
+def prune(db: Session):
+    # Evict least recently hit rows beyond the configured bound
+    stale = (
+        select(models.FeedbackCache.key)
+        .order_by(models.FeedbackCache.last_hit_at.desc())
+        .offset(settings.feedback_cache_max_rows)
+    )
+    db.execute(
+        delete(models.FeedbackCache).where(models.FeedbackCache.key.in_(stale)),
+        execution_options={"synchronize_session": False},
+    )
@@ -0,0 +1,275 @@
+# app/feedback_jobs.py
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+import openai
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+from app import auth_cache, feedback_cache, feedback_service, models, quota
+from app.config import settings
+from app.database import SessionLocal
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Job = models.FeedbackJob
+
+# Set whenever a job is enqueued in this process so idle workers skip the
+# rest of their poll interval. Workers in other processes still poll.
+_wakeup = asyncio.Event()
+
+
+def notify():
+    _wakeup.set()
+
+
+def _claimable(now: datetime):
+    # Queued jobs that are due, plus running jobs whose worker died and let
+    # the lease lapse
+    stale = now - timedelta(seconds=settings.feedback_job_lease_seconds)
+    return or_(
+        and_(Job.status == QUEUED, Job.run_after <= now),
+        and_(Job.status == RUNNING, Job.locked_at < stale),
+    )
+
+
+def claim(db: Session) -> Optional[int]:
+    now = datetime.utcnow()
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Concurrent workers skip rows another transaction already holds
+        job = db.execute(
+            select(Job)
+            .where(_claimable(now))
+            .order_by(Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if job is None:
+            db.rollback()
+            return None
+
+        job_id = job.id
+        job.status = RUNNING
+        job.locked_at = now
+        job.attempts += 1
+        db.commit()
+        return job_id
+
+    # SQLite has no row locks: pick a candidate, then take it with a
+    # compare-and-set UPDATE. Losing the race just means polling again.
+    job_id = db.execute(
+        select(Job.id).where(_claimable(now)).order_by(Job.id).limit(1)
+    ).scalar_one_or_none()
+    if job_id is None:
+        db.rollback()
+        return None
+
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, _claimable(now))
+        .values(status=RUNNING, locked_at=now, attempts=Job.attempts + 1)
+    )
+    db.commit()
+    return job_id if result.rowcount == 1 else None
+
+
+def _claim_next() -> Optional[int]:
+    db = SessionLocal()
+    try:
+        return claim(db)
+    finally:
+        db.close()
+
+
+def _release(db: Session, job) -> bool:
+    # Hand back the unit of quota reserved when the job was enqueued.
+    # Clearing `charge` makes it happen at most once per job.
+    if not job.charge:
+        return False
+    quota.refund(db, job.user_id)
+    job.charge = False
+    return True
+
+
+def _entry(db: Session, job):
+    # None once the entry is deleted: the delete sets entry_id to NULL (or,
+    # without enforced foreign keys, leaves it pointing at nothing)
+    if job.entry_id is None:
+        return None
+    return db.query(models.JournalEntry).filter(
+        models.JournalEntry.id == job.entry_id,
+        models.JournalEntry.user_id == job.user_id
+    ).first()
+
+
+def _load(job_id: int):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return None
+        user_id = job.user_id
+        entry = _entry(db, job)
+        if not entry:
+            job.status = FAILED
+            job.error = "Journal entry not found"
+            job.locked_at = None
+            refunded = _release(db, job)
+            db.commit()
+            if refunded:
+                auth_cache.invalidate(user_id)
+            return None
+
+        key = feedback_cache.cache_key(entry.title, entry.content)
+        cached = feedback_cache.lookup(db, key)
+        db.commit()
+        return job.attempts, entry.title, entry.content, key, cached
+    finally:
+        db.close()
+
+
+def _complete(job_id: int, feedback: str, key: str, upstream: bool):
+    # Feedback, cache row, quota and job status commit together. Only an
+    # upstream call uses up the reserved quota; anything else refunds it.
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return
+        user_id = job.user_id
+        refunded = False
+        entry = _entry(db, job)
+        if not entry:
+            job.status = FAILED
+            job.error = "Journal entry not found"
+            refunded = _release(db, job)
+        else:
+            entry.feedback = feedback
+            feedback_cache.store(db, key, feedback)
+            if not upstream:
+                refunded = _release(db, job)
+            job.status = DONE
+            job.feedback = feedback
+            job.error = None
+        job.locked_at = None
+        db.commit()
+        if entry:
+            feedback_cache.remember(key, feedback)
+        if refunded:
+            auth_cache.invalidate(user_id)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _fail(job_id: int, error: str, retry_in: Optional[float]):
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return
+        user_id = job.user_id
+        refunded = False
+        job.error = error
+        job.locked_at = None
+        if _entry(db, job) is None:
+            # Nothing left to retry for
+            job.status = FAILED
+            job.error = "Journal entry not found"
+            refunded = _release(db, job)
+        elif retry_in is None or job.attempts >= settings.feedback_job_max_attempts:
+            job.status = FAILED
+            refunded = _release(db, job)
+        else:
+            job.status = QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=retry_in)
+        db.commit()
+        if refunded:
+            auth_cache.invalidate(user_id)
+    finally:
+        db.close()
+
+
+def retry_delay(exc: Exception, attempts: int) -> Optional[float]:
+    # Only throttling, upstream 5xx, timeouts and dropped connections are
+    # worth retrying; anything else fails the job straight away.
+    retry_after = None
+    if isinstance(exc, openai.APIStatusError):
+        if exc.status_code != 429 and exc.status_code < 500:
+            return None
+        retry_after = exc.response.headers.get("retry-after")
+    elif not isinstance(exc, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return None
+
+    delay = min(
+        settings.feedback_job_backoff_seconds * 2 ** max(attempts - 1, 0),
+        settings.feedback_job_backoff_max_seconds,
+    )
+    delay = random.uniform(delay / 2, delay)
+    try:
+        delay = max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+
+async def run_job(job_id: int):
+    loaded = await run_in_threadpool(_load, job_id)
+    if loaded is None:
+        return
+    attempts, title, content, key, cached = loaded
+
+    if cached is not None:
+        await run_in_threadpool(_complete, job_id, cached, key, False)
+        return
+
+    try:
+        feedback = await feedback_service.generate_once(key, title, content)
+    except Exception as e:
+        delay = retry_delay(e, attempts)
+        print(f"Feedback job {job_id} attempt {attempts} failed: {e!r}")
+        await run_in_threadpool(_fail, job_id, str(e) or type(e).__name__, delay)
+        return
+
+    await run_in_threadpool(_complete, job_id, feedback, key, True)
+
+
+async def worker(name: str):
+    while True:
+        try:
+            job_id = await run_in_threadpool(_claim_next)
+        except Exception as e:
+            print(f"Feedback worker {name} could not claim a job: {e}")
+            job_id = None
+
+        if job_id is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.feedback_job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+
+        try:
+            await run_job(job_id)
+        except Exception as e:
+            # Job stays 'running' and is re-claimed once its lease lapses
+            print(f"Feedback worker {name} crashed on job {job_id}: {e}")
+
+
+def start_workers(count: int):
+    return [asyncio.create_task(worker(f"w{i}")) for i in range(count)]
+
+
+async def stop_workers(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,120 @@
+# app/feedback_service.py
+# Shared AI feedback logic behind every /ai-feedback route and the job workers.
+
+import asyncio
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import ai_service, auth_cache, feedback_cache, models, quota
+from app.database import SessionLocal
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+def get_entry(db: Session, entry_id: int, user_id: int):
+    return db.query(models.JournalEntry).filter(
+        models.JournalEntry.id == entry_id,
+        models.JournalEntry.user_id == user_id
+    ).first()
+
+
+def apply_cached(db: Session, entry: models.JournalEntry, key: str):
+    feedback = feedback_cache.lookup(db, key)
+    if feedback is not None:
+        entry.feedback = feedback
+        db.commit()
+    return feedback
+
+
+def save_feedback(entry_id: int, user_id: int, feedback: str, key: str) -> bool:
+    # Opens its own session so it can run after the request's has closed.
+    # Feedback and cache row land in one transaction.
+    db = SessionLocal()
+    try:
+        entry = get_entry(db, entry_id, user_id)
+        if not entry:
+            return False
+
+        entry.feedback = feedback
+        feedback_cache.store(db, key, feedback)
+        db.commit()
+        feedback_cache.remember(key, feedback)
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# In-process single flight: concurrent requests for the same prompt share
+# one upstream call instead of each starting their own
+_inflight = {}
+
+
+async def generate_once(key: str, title: str, content: str) -> str:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(ai_service.generate_feedback(title, content))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller giving up doesn't cancel the call for the others
+    return await asyncio.shield(task)
+
+
+def _active_job(db: Session, dedupe_key: str):
+    return db.query(models.FeedbackJob).filter(
+        models.FeedbackJob.dedupe_key == dedupe_key,
+        models.FeedbackJob.status.in_(ACTIVE_JOB_STATUSES)
+    ).first()
+
+
+def _refund(db: Session, user_id: int):
+    quota.refund(db, user_id)
+    db.commit()
+    auth_cache.invalidate(user_id)
+
+
+def enqueue_or_join(db: Session, user_id: int, entry_id: int, key: str, limit: Optional[int]):
+    # At most one active job per (entry, content hash), across every API
+    # process: a partial unique index on dedupe_key makes the active job row
+    # the lease. Losers of the insert race join the winner's job, so the
+    # upstream call happens once. Joining is free; a unit of quota (when
+    # `limit` isn't None) is reserved only right before inserting a new job,
+    # which then holds it, and handed back if the insert loses the race.
+    dedupe_key = f"{entry_id}:{key}"
+    charge = limit is not None
+    for _ in range(3):
+        job = _active_job(db, dedupe_key)
+        if job:
+            return job.id, job.status
+
+        if charge and quota.reserve(db, user_id, limit) is None:
+            raise quota.exceeded(limit)
+
+        job = models.FeedbackJob(
+            user_id=user_id,
+            entry_id=entry_id,
+            dedupe_key=dedupe_key,
+            charge=charge,
+            status="queued"
+        )
+        db.add(job)
+        try:
+            db.flush()
+            job_id = job.id
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            if charge:
+                _refund(db, user_id)
+            continue
+        except Exception:
+            db.rollback()
+            if charge:
+                _refund(db, user_id)
+            raise
+        return job_id, "queued"
+
+    raise HTTPException(status_code=409, detail="Feedback request is already being processed")
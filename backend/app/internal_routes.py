@@ -0,0 +1,53 @@
+# app/internal_routes.py
+# Operational endpoints. Hidden (404) unless INTERNAL_TOKEN is set, and
+# callers must send it in the X-Internal-Token header (or as a bearer
+# token, which is what Prometheus scrape configs support).
+
+import hmac
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import text
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app import pool_stats, query_stats
+
+internal_router = APIRouter(prefix="/internal", include_in_schema=False)
+
+
+def require_internal_token(
+    x_internal_token: str = Header(default=None), authorization: str = Header(default=None)
+):
+    if not settings.internal_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token and authorization and authorization.startswith("Bearer "):
+        x_internal_token = authorization[len("Bearer "):]
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.internal_token):
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+
+
+# Connection pool usage and checkout wait times
+@internal_router.get("/db", dependencies=[Depends(require_internal_token)])
+def db_pool_stats():
+    return pool_stats.snapshot()
+
+
+# Statements per route: counts, DB time, slow queries, N+1 flags, budgets
+@internal_router.get("/queries", dependencies=[Depends(require_internal_token)])
+def query_stats_report():
+    return query_stats.snapshot()
+
+
+# Round trip through the async pool
+@internal_router.get("/health", dependencies=[Depends(require_internal_token)])
+async def db_health():
+    start = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    return {
+        "database": "ok",
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        "saturation": {name: stats.get("saturation") for name, stats in pool_stats.snapshot().items()},
+    }
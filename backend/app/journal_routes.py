@@ -1,215 +1,320 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app import models
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_async_db
+from app import models, bulk_entries, conditional, date_range, entry_views, export, pagination, query_stats, search
 from app.auth_routes import get_current_user
-from app.schemas import EntryCreate
+from app.auth_cache import CurrentUser
+from app.schemas import (
+    BulkCreated, BulkDeleted, EntriesImported, EntryBulkCreate, EntryBulkDelete, EntryCreate, EntryOut, EntryPage,
+    EntryPatch, EntrySearchHit, EntrySummary, EntrySummaryPage
+)
+from app.responses import UTCJSONResponse, model_response
 from datetime import datetime
-from typing import List
-import openai
-from app.config import settings
+from typing import List, Optional, Union
+
+journal_router = APIRouter(default_response_class=UTCJSONResponse)
+
+# Statement budgets (app/query_stats.py) include one user load on an auth
+# cache miss
+WRITE_BUDGET = [Depends(query_stats.budget(3))]
+READ_BUDGET = [Depends(query_stats.budget(3))]
 
-journal_router = APIRouter()
 
-client = openai.OpenAI(api_key=settings.openai_api_key)
+def entry_etag(entry_id: int, updated_at: Optional[datetime]) -> str:
+    return conditional.etag("entry", entry_id, updated_at.isoformat() if updated_at else None)
+
+
+# Single-entry writes are one INSERT/UPDATE/DELETE ... RETURNING with the
+# ownership check in its WHERE clause, plus the journal_version bump that
+# the ORM flush hook would otherwise make
+def _owned(entry_id: int, user_id: int):
+    return (models.JournalEntry.id == entry_id, models.JournalEntry.user_id == user_id)
+
+
+async def _finish_write(db: AsyncSession, user_id: int, row):
+    if row is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Journal entry not found")
+    await db.execute(models.bump_journal_version([user_id]))
+    await db.commit()
+    return row
+
 
 # CREATE
-@journal_router.post("/journal")
-def create_journal_entry(
+@journal_router.post("/journal", response_model=EntryOut, dependencies=WRITE_BUDGET)
+async def create_journal_entry(
     entry: EntryCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    db_entry = models.JournalEntry(
-        title=entry.title,
-        content=entry.content,
-        feedback=entry.feedback,
-        user_id=current_user.id,
-        created_at=datetime.utcnow()
-    )
-    db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
-    return {
-        "id": db_entry.id,
-        "title": db_entry.title,
-        "content": db_entry.content,
-        "feedback": db_entry.feedback,
-        "created_at": db_entry.created_at
-    }
+    row = bulk_entries.entry_row(current_user.id, entry, datetime.utcnow())
+    db_entry = (await db.execute(
+        insert(models.JournalEntry).values(row).returning(models.JournalEntry)
+    )).scalar_one()
+    await _finish_write(db, current_user.id, db_entry)
+    return model_response(EntryOut, db_entry)
 
-# LIST ALL (Paginated)
-@journal_router.get("/journal")
-def get_journals(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    entries = db.query(models.JournalEntry).filter(
-        models.JournalEntry.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-
-    return [
-        {
-            "id": entry.id,
-            "title": entry.title,
-            "content": entry.content,
-            "feedback": entry.feedback,
-            "created_at": entry.created_at
-        }
-        for entry in entries
-    ]
+# BULK CREATE / DELETE / IMPORT
+# Declared before /journal/{entry_id} so "bulk" isn't read as an id. Each
+# request is one transaction: everything is written or nothing is.
+def _check_bulk_size(count: int):
+    if count > settings.journal_bulk_max_entries:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.journal_bulk_max_entries} entries per request"
+        )
 
-# DELETE Journal Entry
-@journal_router.delete("/journal/{entry_id}")
-def delete_journal_entry(
-    entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+@journal_router.post("/journal/bulk", response_model=BulkCreated)
+async def create_journal_entries(
+    request: EntryBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    db_entry = db.query(models.JournalEntry).filter(
-        models.JournalEntry.id == entry_id,
-        models.JournalEntry.user_id == current_user.id
-    ).first()
+    _check_bulk_size(len(request.entries))
+    ids = await bulk_entries.create(db, current_user.id, request.entries) if request.entries else []
+    return model_response(BulkCreated, {"created": len(ids), "ids": ids})
 
-    if not db_entry:
-        raise HTTPException(status_code=404, detail="Journal entry not found")
+@journal_router.delete("/journal/bulk", response_model=BulkDeleted)
+async def delete_journal_entries(
+    request: EntryBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    _check_bulk_size(len(request.ids))
+    ids = await bulk_entries.delete_many(db, current_user.id, request.ids) if request.ids else []
+    return model_response(BulkDeleted, {"deleted": len(ids), "ids": ids})
 
-    db.delete(db_entry)
-    db.commit()
-    return {"message": "Deleted"}
+# Body is NDJSON, one EntryCreate per line (GET /journal/export output
+# works as-is, keeping created_at). Read and written in batches as it arrives.
+@journal_router.post("/journal/import", response_model=EntriesImported)
+async def import_journal(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    created = await bulk_entries.import_ndjson(db, current_user.id, request.stream())
+    return model_response(EntriesImported, {"created": created})
 
-# AI FEEDBACK
-@journal_router.post("/ai-feedback/{entry_id}")
-def ai_feedback(
-    entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+# LIST ALL (Paginated)
+# Offset mode (?skip=&limit=) returns a plain list, as it always has.
+# Cursor mode (?paginate=cursor, then ?cursor=<next_cursor>) returns
+# {"items": [...], "next_cursor": ...} and costs the same on every page.
+# ?view=summary (or ?fields=title,preview,...) returns projected rows
+# without content or feedback; GET /journal/{id} has the full entry.
+# The ETag covers the user's journal_version and the query string, so an
+# unchanged list costs one primary-key lookup and a 304.
+@journal_router.get(
+    "/journal",
+    response_model=Union[List[EntryOut], EntryPage, List[EntrySummary], EntrySummaryPage],
+    dependencies=READ_BUDGET
+)
+async def get_journals(
+    request: Request,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    paginate: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    view: str = Query(default="full", pattern="^(full|summary)$"),
+    fields: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    is_demo = current_user.email in ["demo@nightingale.ai", "gpt3@nightingale.ai"]
-    has_reached_limit = current_user.feedback_count >= 3 and not current_user.is_premium
+    projection = entry_views.parse_fields(view, fields)
 
-    if not is_demo and has_reached_limit:
-        raise HTTPException(
-            status_code=403,
-            detail="Upgrade to Premium. Free AI feedback limit reached (3/3)"
-        )
+    # Read before the page so a write in between can only make the tag stale
+    version = (await db.execute(
+        select(models.User.journal_version).where(models.User.id == current_user.id)
+    )).scalar_one()
+    tag = conditional.etag("journal", current_user.id, version, request.url.query)
+    if conditional.is_fresh(request, tag):
+        return conditional.not_modified(tag)
+    if projection is None:
+        query = select(models.JournalEntry)
+        item, page = EntryOut, EntryPage
+    else:
+        query = select(*entry_views.columns(projection))
+        item, page = EntrySummary, EntrySummaryPage
 
-    entry = db.query(models.JournalEntry).filter(
-        models.JournalEntry.id == entry_id,
+    query = query.where(
         models.JournalEntry.user_id == current_user.id
-    ).first()
-
+    ).order_by(models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc())
 
-    if not entry:
-        raise HTTPException(status_code=404, detail="Journal entry not found")
+    async def fetch(statement):
+        result = await db.execute(statement)
+        return result.scalars().all() if projection is None else result.all()
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a supportive, kind journaling coach."},
-                {"role": "user", "content": f"Give uplifting feedback on this entry titled '{entry.title}':\n\n{entry.content}"}
-            ],
-            max_tokens=150
+    if cursor is None and paginate == "offset":
+        entries = await fetch(query.offset(skip).limit(limit))
+        return model_response(
+            List[item], entries, headers=conditional.headers(tag), exclude_unset=projection is not None
         )
 
-        feedback = response.choices[0].message.content
-        entry.feedback = feedback
-
-        if not is_demo:
-            current_user.feedback_count += 1
+    if cursor:
+        created_at, entry_id = pagination.decode_cursor(cursor)
+        query = query.where(
+            tuple_(models.JournalEntry.created_at, models.JournalEntry.id) < tuple_(created_at, entry_id)
+        )
 
-        db.commit()
-        db.refresh(entry)
+    # One extra row tells us whether another page exists
+    entries = await fetch(query.limit(limit + 1))
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = pagination.encode_cursor(entries[-1].created_at, entries[-1].id)
 
-        return {"feedback": feedback}
+    return model_response(
+        page, {"items": entries, "next_cursor": next_cursor},
+        headers=conditional.headers(tag), exclude_unset=projection is not None
+    )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# DELETE Journal Entry
+@journal_router.delete("/journal/{entry_id}", dependencies=WRITE_BUDGET)
+async def delete_journal_entry(
+    entry_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    deleted = (await db.execute(
+        delete(models.JournalEntry)
+        .where(*_owned(entry_id, current_user.id))
+        .returning(models.JournalEntry.id)
+    )).scalar()
+    await _finish_write(db, current_user.id, deleted)
+    return {"message": "Deleted"}
 
-# SEARCH Journal
-@journal_router.get("/journal/search")
-def search_journals(
+# SEARCH Journal (ranked full-text, paginated)
+@journal_router.get("/journal/search", response_model=List[EntrySearchHit], dependencies=READ_BUDGET)
+async def search_journals(
     q: str = Query(default=None),
     title: str = Query(default=None),
     date: str = Query(default=None),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    date_from: str = Query(default=None, alias="from"),
+    date_to: str = Query(default=None, alias="to"),
+    tz: str = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    query = db.query(models.JournalEntry).filter(models.JournalEntry.user_id == current_user.id)
-
-    if q:
-        query = query.filter(models.JournalEntry.content.ilike(f"%{q}%"))
-    if title:
-        query = query.filter(models.JournalEntry.title.ilike(f"%{title}%"))
-    if date:
-        query = query.filter(models.JournalEntry.created_at.startswith(date))
-
-    results = query.all()
-
-    return [
-        {
-            "id": entry.id,
-            "title": entry.title,
-            "content": entry.content,
-            "feedback": entry.feedback,
-            "created_at": entry.created_at
-        }
-        for entry in results
+    # `date` (one whole day) and `from`/`to` become half-open ranges on created_at
+    start, end = date_range.resolve(date_from=date_from, date_to=date_to, on=date, tz=tz)
+    filters = date_range.created_at_filters(start, end)
+
+    if q or title:
+        results = await search.search_entries(
+            db, current_user.id, q=q, title=title, filters=filters, limit=limit, offset=offset
+        )
+    else:
+        entries = (await db.execute(
+            select(models.JournalEntry).where(
+                models.JournalEntry.user_id == current_user.id, *filters
+            ).order_by(
+                models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc()
+            ).limit(limit).offset(offset)
+        )).scalars().all()
+        results = [(entry, None, None) for entry in entries]
+
+    hits = [
+        EntrySearchHit.model_validate(entry).model_copy(update={"score": score, "snippet": snippet})
+        for entry, score, snippet in results
     ]
+    return model_response(List[EntrySearchHit], hits)
+
+# EXPORT the whole journal, oldest first, as NDJSON (default) or CSV.
+# ?gzip=true compresses on the fly and downloads a .gz file.
+@journal_router.get("/journal/export")
+async def export_journal(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(default=False),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    media_type = "application/gzip" if gzip else export.MEDIA_TYPES[format]
+    return StreamingResponse(
+        export.stream(current_user.id, format, gzip),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{export.filename(format, gzip)}"',
+            "Cache-Control": "no-store",
+        }
+    )
 
 # GET Journal by ID
-@journal_router.get("/journal/{entry_id}")
-def get_journal_by_id(
+@journal_router.get("/journal/{entry_id}", response_model=EntryOut, dependencies=READ_BUDGET)
+async def get_journal_by_id(
     entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    entry = db.query(models.JournalEntry).filter(
-        models.JournalEntry.id == entry_id,
-        models.JournalEntry.user_id == current_user.id
-    ).first()
+    if conditional.requested(request):
+        # Revalidation only needs updated_at, not the entry's text
+        updated_at = (await db.execute(
+            select(models.JournalEntry.updated_at).where(
+                models.JournalEntry.id == entry_id,
+                models.JournalEntry.user_id == current_user.id
+            )
+        )).first()
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Journal entry not found")
+        tag = entry_etag(entry_id, updated_at[0])
+        if conditional.is_fresh(request, tag, updated_at[0]):
+            return conditional.not_modified(tag, updated_at[0])
+
+    entry = (await db.execute(
+        select(models.JournalEntry).where(
+            models.JournalEntry.id == entry_id,
+            models.JournalEntry.user_id == current_user.id
+        )
+    )).scalars().first()
 
     if not entry:
         raise HTTPException(status_code=404, detail="Journal entry not found")
 
-    return {
-        "id": entry.id,
-        "title": entry.title,
-        "content": entry.content,
-        "feedback": entry.feedback,
-        "created_at": entry.created_at
-    }
-
-# UPDATE Journal by ID
-@journal_router.put("/journal/{entry_id}")
-def update_journal_entry(
+    tag = entry_etag(entry.id, entry.updated_at)
+    return model_response(EntryOut, entry, headers=conditional.headers(tag, entry.updated_at))
+
+async def _update_entry(db: AsyncSession, entry_id: int, user_id: int, values: dict):
+    if "content" in values:
+        values["word_count"] = models.count_words(values["content"])
+    values["updated_at"] = datetime.utcnow()
+    entry = (await db.execute(
+        update(models.JournalEntry)
+        .where(*_owned(entry_id, user_id))
+        .values(values)
+        .returning(models.JournalEntry)
+        .execution_options(synchronize_session=False)
+    )).scalar()
+    return await _finish_write(db, user_id, entry)
+
+# UPDATE Journal by ID (replaces title, content and feedback)
+@journal_router.put("/journal/{entry_id}", response_model=EntryOut, dependencies=WRITE_BUDGET)
+async def update_journal_entry(
     entry_id: int,
     updated_entry: EntryCreate = Body(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    entry = db.query(models.JournalEntry).filter(
-        models.JournalEntry.id == entry_id,
-        models.JournalEntry.user_id == current_user.id
-    ).first()
+    entry = await _update_entry(db, entry_id, current_user.id, updated_entry.model_dump())
+    return model_response(EntryOut, entry)
 
-    if not entry:
-        raise HTTPException(status_code=404, detail="Journal entry not found")
-
-    entry.title = updated_entry.title
-    entry.content = updated_entry.content
-    entry.feedback = updated_entry.feedback
-
-    db.commit()
-    db.refresh(entry)
-
-    return {
-        "id": entry.id,
-        "title": entry.title,
-        "content": entry.content,
-        "feedback": entry.feedback,
-        "created_at": entry.created_at
-    }
+# PATCH Journal by ID (only the fields sent)
+@journal_router.patch("/journal/{entry_id}", response_model=EntryOut, dependencies=WRITE_BUDGET)
+async def patch_journal_entry(
+    entry_id: int,
+    changes: EntryPatch = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    values = changes.model_dump(exclude_unset=True)
+    if values:
+        entry = await _update_entry(db, entry_id, current_user.id, values)
+    else:
+        entry = (await db.execute(
+            select(models.JournalEntry).where(*_owned(entry_id, current_user.id))
+        )).scalars().first()
+        if not entry:
+            raise HTTPException(status_code=404, detail="Journal entry not found")
+    return model_response(EntryOut, entry)
@@ -0,0 +1,211 @@
+# app/metrics.py
+# In-process metrics rendered in the Prometheus text format at /metrics.
+# Counters, gauges and histograms are plain dicts keyed by label values
+# behind a lock, so recording costs a dict lookup and a few additions.
+
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Sequence, Tuple
+import httpx
+
+# Seconds; requests are mostly milliseconds, upstream calls mostly seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value) -> str:
+    if isinstance(value, float):
+        return repr(value) if value != int(value) or abs(value) >= 1e15 else str(int(value))
+    return str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}" for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(float(bound))
+                bucket_labels = _format_labels(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")
+)
+http_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route")
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled right now.")
+
+upstream_requests = Counter(
+    "upstream_requests_total", "Calls to external services by outcome.", ("service", "operation", "outcome")
+)
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services.",
+    ("service", "operation"), buckets=UPSTREAM_BUCKETS
+)
+openai_gate_wait = Histogram(
+    "openai_gate_wait_seconds", "Time spent waiting for a free OpenAI concurrency slot.",
+    buckets=UPSTREAM_BUCKETS
+)
+openai_tokens = Counter("openai_tokens_total", "OpenAI tokens used, from response.usage.", ("model", "type"))
+emails_sent = Counter("emails_sent_total", "Emails accepted by the transport, by outcome.", ("outcome",))
+
+REGISTRY = [
+    http_requests, http_duration, http_in_flight,
+    upstream_requests, upstream_duration, openai_gate_wait, openai_tokens, emails_sent,
+]
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _outcome(exc: BaseException) -> str:
+    # "cancelled" covers callers giving up, including an asyncio.wait_for
+    # deadline around the call
+    if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "error"
+
+
+class UpstreamCall:
+    def __init__(self):
+        self.outcome = "ok"
+
+
+@asynccontextmanager
+async def upstream(service: str, operation: str):
+    """Time one external call.
+
+    An exception becomes the outcome (timeout, cancelled or error) and is
+    re-raised; set `call.outcome` for failures that don't raise.
+    """
+    call = UpstreamCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        call.outcome = _outcome(e)
+        raise
+    finally:
+        upstream_duration.observe((service, operation), time.perf_counter() - start)
+        upstream_requests.inc((service, operation, call.outcome))
+
+
+def record_usage(model: str, usage):
+    if usage is None:
+        return
+    openai_tokens.inc((model, "prompt"), usage.prompt_tokens or 0)
+    openai_tokens.inc((model, "completion"), usage.completion_tokens or 0)
+
+
+class MetricsMiddleware:
+    # Plain ASGI: counts, latency and in-flight for every HTTP request,
+    # labelled with the matched route template rather than the raw path
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "(unmatched)"
+            method = scope["method"]
+            http_duration.observe((method, route), time.perf_counter() - start)
+            http_requests.inc((method, route, str(status)))
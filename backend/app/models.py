@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy import event, text, update
+from sqlalchemy.orm import Session, relationship, validates
 from datetime import datetime, timedelta
 from app.database import Base  
 
@@ -12,13 +13,21 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(Text, nullable=False)  
     feedback_count = Column(Integer, default=0, nullable=False)
+    # Start of the current quota window when FEEDBACK_QUOTA_WINDOW_DAYS is set
+    feedback_window_start = Column(DateTime, nullable=True)
     is_premium = Column(Boolean, default=False, nullable=False)
+    # Bumped whenever one of the user's entries changes; list ETags use it
+    journal_version = Column(Integer, default=0, server_default="0", nullable=False)
 
 
     # Relationship to journal entries
     entries = relationship("JournalEntry", back_populates="owner")
 
 
+def count_words(text) -> int:
+    return len(text.split()) if text else 0
+
+
 # JournalEntry model
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
@@ -28,11 +37,48 @@ class JournalEntry(Base):
     content = Column(Text, nullable=False)
     feedback = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Kept in step with content so list views don't scan the text
+    word_count = Column(Integer, nullable=True)
 
     # Back reference to user
     owner = relationship("User", back_populates="entries")
 
+    @validates("content")
+    def _count_words(self, key, value):
+        self.word_count = count_words(value)
+        return value
+
+    __table_args__ = (
+        # Serves per-user listings newest first, including keyset pagination
+        Index("ix_journal_entries_user_created", "user_id", "created_at", "id"),
+    )
+
+
+def bump_journal_version(user_ids):
+    # Core writes to journal_entries skip the flush hook below and must
+    # execute this themselves
+    return (
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(journal_version=User.journal_version + 1)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_journal_versions(session, flush_context):
+    # Any flush that adds, changes or deletes entries bumps their owners'
+    # journal_version in the same transaction
+    user_ids = {
+        obj.user_id
+        for obj in (*session.new, *session.deleted, *session.dirty)
+        if isinstance(obj, JournalEntry)
+        and (obj not in session.dirty or session.is_modified(obj, include_collections=False))
+    }
+    if user_ids:
+        session.connection().execute(bump_journal_version(user_ids))
+
 
 # PasswordResetToken model
 class PasswordResetToken(Base):
@@ -45,3 +91,91 @@ class PasswordResetToken(Base):
 
     # Link to user
     user = relationship("User")
+
+
+# Cached AI feedback, keyed by a hash of the exact prompt sent to OpenAI
+class FeedbackCache(Base):
+    __tablename__ = "ai_feedback_cache"
+
+    key = Column(String(64), primary_key=True)
+    feedback = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+# Queued AI feedback request, drained by the workers in app/feedback_jobs.py
+class FeedbackJob(Base):
+    __tablename__ = "ai_feedback_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Cleared when the entry is deleted; the worker then fails the job and
+    # refunds its quota instead of the row vanishing with the unit still held
+    entry_id = Column(Integer, ForeignKey("journal_entries.id", ondelete="SET NULL"), nullable=True)
+    dedupe_key = Column(String, nullable=True)
+    status = Column(String, default="queued", nullable=False)
+    # Holds a reserved unit of quota, refunded unless an upstream call uses it
+    charge = Column(Boolean, default=True, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    feedback = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_ai_feedback_jobs_status_run_after", "status", "run_after"),
+        # One active job per entry + content hash; doubles as a cross-process lease
+        Index(
+            "uq_ai_feedback_jobs_active_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+
+# Outgoing email, written in the same transaction as whatever triggers it
+# and sent by the dispatcher in app/email_outbox.py
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_run_after", "status", "run_after"),
+    )
+
+
+# Raw Square webhook deliveries, one row per Square event id so redeliveries
+# are dropped. Applied by the processor in app/square_events.py.
+class SquareEvent(Base):
+    __tablename__ = "square_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_square_events_status_run_after", "status", "run_after"),
+    )
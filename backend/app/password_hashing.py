@@ -0,0 +1,97 @@
+# app/password_hashing.py
+# bcrypt runs in a small dedicated process pool so a burst of logins can't
+# hold the GIL or starve the threadpool. Admission is bounded: once
+# PASSWORD_HASH_MAX_PENDING calls are queued or running, callers get a 503
+# with Retry-After instead of waiting behind the burst.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+from app.config import settings
+
+# Raising BCRYPT_ROUNDS marks existing hashes as needing an update; they're
+# rehashed on the user's next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+# Run in the worker processes
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return pwd_context.verify_and_update(password.strip(), hashed_password.strip())
+    except Exception:
+        return False, None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the parent has an event loop and threads running
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _busy():
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+
+async def _submit(fn, *args):
+    global _pending, _executor
+    if settings.password_hash_workers <= 0:
+        return await run_in_threadpool(fn, *args)
+
+    if _pending >= settings.password_hash_max_pending:
+        raise _busy()
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next caller
+        _executor = None
+        raise _busy()
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Return (valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return await _submit(_verify_and_update, password, hashed_password)
+
+
+def start():
+    # Spawn workers up front so the first logins don't pay for it
+    if settings.password_hash_workers > 0:
+        executor = _get_executor()
+        for _ in range(settings.password_hash_workers):
+            executor.submit(int)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,165 @@
+# app/pool_stats.py
+# Connection pool settings and instrumentation. Each engine gets a queue
+# pool subclass that times checkouts, plus pool event listeners that count
+# connects, invalidations and peak usage. snapshot() is what
+# /internal/db reports.
+
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.peak_in_use = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def _in_use(self, pool):
+        try:
+            return pool.checkedout()
+        except AttributeError:
+            return None
+
+    def snapshot(self):
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+            data = {
+                "checkouts": checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_ms": {
+                    "mean": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                    "p95": round(_percentile(waits, 95) * 1000, 3),
+                    "max": round(self.wait_max * 1000, 3),
+                },
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "peak_in_use": self.peak_in_use,
+            }
+
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            in_use = pool.checkedout()
+            data.update({
+                "pool_class": type(pool).__name__,
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "in_use": in_use,
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "saturation": round(in_use / capacity, 3) if capacity > 0 else None,
+            })
+        elif pool is not None:
+            data["pool_class"] = type(pool).__name__
+        return data
+
+
+class _TimedCheckout:
+    # Set per engine on a generated subclass, so pool.recreate() on
+    # engine.dispose() keeps reporting to the same stats
+    stats: PoolStats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+def engine_options(url, stats: PoolStats, is_async: bool = False) -> dict:
+    """create_engine() pool keyword arguments for `url`, from Settings."""
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+    # In-memory SQLite runs on a single shared connection; leave its pool alone
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    options.update({
+        "poolclass": type(f"Timed{base.__name__}", (_TimedCheckout, base), {"stats": stats}),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    })
+    return options
+
+
+def instrument(engine, stats: PoolStats):
+    stats.engine = engine
+    # Pool events for an AsyncEngine are registered on its sync_engine
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(target, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use = stats._in_use(engine.pool)
+        if in_use is not None:
+            with stats._lock:
+                stats.peak_in_use = max(stats.peak_in_use, in_use)
+
+    @event.listens_for(target, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.invalidations += 1
+
+    @event.listens_for(target, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.soft_invalidations += 1
+
+    return engine
+
+
+sync_stats = PoolStats("sync")
+async_stats = PoolStats("async")
+
+
+def snapshot():
+    return {"sync": sync_stats.snapshot(), "async": async_stats.snapshot()}
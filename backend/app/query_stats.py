@@ -0,0 +1,204 @@
+# app/query_stats.py
+# Per-request SQL accounting. Cursor events on both engines add each
+# statement's count and time to the request that ran it (tracked in a
+# context variable set by QueryStatsMiddleware), log slow statements and
+# flag N+1 patterns. snapshot() is what /internal/queries reports.
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event
+from app.config import settings
+
+# Characters of a statement kept in log lines and reports
+STATEMENT_PREVIEW = 300
+
+
+class RequestQueries:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.budget: Optional[int] = None
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = 0
+        self.statements = Counter()
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route or self.path}"
+
+    @property
+    def route_key(self) -> str:
+        # Unmatched paths share one entry so stray URLs can't grow the report
+        return f"{self.method} {self.route or '(unmatched)'}"
+
+    def repeated(self):
+        # Same statement text (parameters are bound separately) run over
+        # and over in one request: usually a lazy load in a loop
+        return [
+            (statement, count) for statement, count in self.statements.most_common()
+            if count >= settings.n_plus_one_threshold
+        ]
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+# Active capture() blocks; each gets every finished request
+_captures: List[list] = []
+
+
+class RouteStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, queries: RequestQueries, n_plus_one: bool):
+        with self._lock:
+            route = self.routes.setdefault(queries.route_key, {
+                "requests": 0, "queries": 0, "db_seconds": 0.0, "max_queries": 0,
+                "slow_queries": 0, "n_plus_one": 0, "over_budget": 0, "budget": None,
+            })
+            route["requests"] += 1
+            route["queries"] += queries.count
+            route["db_seconds"] += queries.seconds
+            route["max_queries"] = max(route["max_queries"], queries.count)
+            route["slow_queries"] += queries.slow
+            route["n_plus_one"] += int(n_plus_one)
+            route["over_budget"] += int(queries.over_budget())
+            route["budget"] = queries.budget
+
+    def snapshot(self):
+        with self._lock:
+            routes = {name: dict(route) for name, route in self.routes.items()}
+        for route in routes.values():
+            requests = route["requests"]
+            route["mean_queries"] = round(route["queries"] / requests, 2)
+            route["mean_db_ms"] = round(route["db_seconds"] / requests * 1000, 3)
+            del route["db_seconds"]
+        return dict(sorted(routes.items(), key=lambda item: -item[1]["queries"]))
+
+
+route_stats = RouteStats()
+
+
+def current() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_PREVIEW else statement[:STATEMENT_PREVIEW] + "..."
+
+
+def instrument(engine):
+    # Cursor events for an AsyncEngine are registered on its sync_engine
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        queries = _current.get()
+        if queries is not None:
+            queries.count += 1
+            queries.seconds += elapsed
+            queries.statements[statement] += 1
+        if elapsed * 1000 >= settings.slow_query_ms:
+            if queries is not None:
+                queries.slow += 1
+            where = queries.name if queries is not None else "background"
+            print(f"Slow query ({elapsed * 1000:.1f} ms) in {where}: {preview(statement)}")
+
+    @event.listens_for(target, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    return engine
+
+
+def _finish(queries: RequestQueries):
+    repeated = queries.repeated()
+    for statement, count in repeated:
+        print(f"Possible N+1 in {queries.name}: {count}x {preview(statement)}")
+    if queries.over_budget():
+        print(f"{queries.name} ran {queries.count} queries, over its budget of {queries.budget}")
+    route_stats.record(queries, bool(repeated))
+    for captured in _captures:
+        captured.append(queries)
+
+
+class QueryStatsMiddleware:
+    # Plain ASGI so the context variable is set in the same context the
+    # endpoint and its threadpool calls run in
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope["method"], scope["path"])
+        token = _current.set(queries)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                queries.route = getattr(route, "path", None)
+                if settings.query_stats_headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-query-count", str(queries.count).encode()),
+                        (b"server-timing", f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"'.encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            _finish(queries)
+
+
+def budget(limit: int):
+    """Route dependency declaring how many statements the route may run.
+
+    Going over is logged and counted in /internal/queries, and fails tests
+    that use the query_budget fixture from tests/conftest.py.
+    """
+    async def declare_budget():
+        queries = _current.get()
+        if queries is not None:
+            queries.budget = limit
+    return declare_budget
+
+
+@contextmanager
+def capture():
+    """Collect every request that finishes inside the block."""
+    captured = []
+    _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        _captures.remove(captured)
+
+
+def snapshot():
+    return {
+        "slow_query_ms": settings.slow_query_ms,
+        "n_plus_one_threshold": settings.n_plus_one_threshold,
+        "routes": route_stats.snapshot(),
+    }
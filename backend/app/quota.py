@@ -0,0 +1,177 @@
+# app/quota.py
+# AI feedback quota. A unit is reserved with a single conditional
+# UPDATE ... RETURNING before any upstream call and refunded if the call
+# doesn't produce feedback, so concurrent requests can't overrun a limit.
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import case, false, or_, select, update
+from sqlalchemy.orm import Session
+from app import auth_cache, models
+from app.config import settings
+from app.database import SessionLocal
+
+FREE = "free"
+PREMIUM = "premium"
+DEMO = "demo"
+
+DEMO_EMAILS = ["demo@nightingale.ai", "gpt3@nightingale.ai"]
+
+User = models.User
+
+# Keeps fire-and-forget refunds alive until they finish
+_pending_refunds = set()
+
+
+def plan(user) -> str:
+    if user.email in DEMO_EMAILS:
+        return DEMO
+    return PREMIUM if user.is_premium else FREE
+
+
+def limit_for(user) -> Optional[int]:
+    # None means unlimited; a negative setting also means unlimited
+    limit = {
+        FREE: settings.feedback_limit_free,
+        PREMIUM: settings.feedback_limit_premium,
+        DEMO: None,
+    }[plan(user)]
+    if limit is None or limit < 0:
+        return None
+    return limit
+
+
+def exceeded(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=403,
+        detail=f"Upgrade to Premium. Free AI feedback limit reached ({limit}/{limit})"
+    )
+
+
+def _window_expired(now: datetime):
+    # SQL condition for "the user's quota window has rolled over", or None
+    # when quotas never reset
+    if settings.feedback_quota_window_days <= 0:
+        return None
+    cutoff = now - timedelta(days=settings.feedback_quota_window_days)
+    return or_(User.feedback_window_start.is_(None), User.feedback_window_start <= cutoff)
+
+
+def reserve(db: Session, user_id: int, limit: int, units: int = 1) -> Optional[int]:
+    """Take `units` in one statement and commit; returns the new count, or None if over `limit`."""
+    if units > limit:
+        return None
+
+    now = datetime.utcnow()
+    expired = _window_expired(now)
+    if expired is None:
+        values = {User.feedback_count: User.feedback_count + units}
+        allowed = User.feedback_count + units <= limit
+    else:
+        # A rolled-over window starts again from zero in the same statement
+        values = {
+            User.feedback_count: case((expired, units), else_=User.feedback_count + units),
+            User.feedback_window_start: case((expired, now), else_=User.feedback_window_start),
+        }
+        allowed = or_(expired, User.feedback_count + units <= limit)
+
+    count = db.execute(
+        update(User)
+        .where(User.id == user_id, allowed)
+        .values(values)
+        .returning(User.feedback_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    if count is not None:
+        auth_cache.invalidate(user_id)
+    return count
+
+
+def reserve_now(user_id: int, limit: int) -> Optional[int]:
+    # reserve() in its own session, for callers that outlive the request's
+    db = SessionLocal()
+    try:
+        return reserve(db, user_id, limit)
+    finally:
+        db.close()
+
+
+def reserve_up_to(db: Session, user_id: int, limit: int, wanted: int) -> int:
+    """Take as many of `wanted` units as fit under `limit` and commit; returns how many.
+
+    One conditional UPDATE grants LEAST(wanted, limit - used) and returns
+    the count before and after. The starting count comes from a CTE that
+    locks the row on Postgres; RETURNING only sees the new row.
+    """
+    if wanted <= 0:
+        return 0
+
+    now = datetime.utcnow()
+    expired = _window_expired(now)
+    # A rolled-over window starts again from zero
+    used = User.feedback_count if expired is None else case((expired, 0), else_=User.feedback_count)
+    before = (
+        select(User.id, used.label("used"), (expired if expired is not None else false()).label("expired"))
+        .where(User.id == user_id)
+        .with_for_update()
+        .cte("before")
+        .prefix_with("MATERIALIZED")
+    )
+    before_used = select(before.c.used).scalar_subquery()
+    values = {User.feedback_count: before_used + case(
+        (before_used + wanted <= limit, wanted), else_=limit - before_used
+    )}
+    if expired is not None:
+        values[User.feedback_window_start] = case(
+            (select(before.c.expired).scalar_subquery(), now), else_=User.feedback_window_start
+        )
+
+    row = db.execute(
+        update(User)
+        .add_cte(before)
+        .where(User.id == select(before.c.id).scalar_subquery(), before_used < limit)
+        .values(values)
+        .returning(before_used, User.feedback_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+    if row is None:
+        return 0
+    auth_cache.invalidate(user_id)
+    used_before, used_after = row
+    return used_after - used_before
+
+
+def refund(db: Session, user_id: int, units: int = 1):
+    # Part of the caller's transaction; invalidate auth_cache after commit
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values({
+            User.feedback_count: case(
+                (User.feedback_count > units, User.feedback_count - units), else_=0
+            )
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refund_now(user_id: int, units: int = 1):
+    db = SessionLocal()
+    try:
+        refund(db, user_id, units)
+        db.commit()
+    finally:
+        db.close()
+    auth_cache.invalidate(user_id)
+
+
+def refund_later(user_id: int, units: int = 1):
+    # Safe from a cancelled request: the refund runs in the threadpool
+    # without being awaited
+    future = asyncio.get_running_loop().run_in_executor(None, refund_now, user_id, units)
+    _pending_refunds.add(future)
+    future.add_done_callback(_pending_refunds.discard)
@@ -0,0 +1,38 @@
+# app/responses.py
+# JSON responses rendered with orjson. created_at and friends are stored as
+# naive UTC, so every datetime is written as ISO 8601 with a trailing "Z".
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+_adapters = {}
+
+
+class UTCJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def _adapter(schema) -> TypeAdapter:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter
+
+
+def model_response(schema, value, status_code: int = 200, headers: dict = None,
+                   exclude_unset: bool = False) -> UTCJSONResponse:
+    """Build `schema` from `value` (ORM rows are fine) and render it.
+
+    Returning a Response skips FastAPI's own validate-and-encode pass; the
+    route's response_model still documents the shape. `exclude_unset` drops
+    fields the value didn't provide, for projected rows.
+    """
+    adapter = _adapter(schema)
+    content = adapter.dump_python(
+        adapter.validate_python(value, from_attributes=True), exclude_unset=exclude_unset
+    )
+    return UTCJSONResponse(content, status_code=status_code, headers=headers)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from datetime import datetime
+from typing import List, Optional
 
 # User registration and login schemas
 class UserCreate(BaseModel):
@@ -22,3 +23,79 @@ class EntryCreate(BaseModel):
     title: str
     content: str
     feedback: Optional[str] = None
+
+# Partial update: only fields present in the body are changed. content
+# can be left out but not set to null.
+class EntryPatch(BaseModel):
+    title: Optional[str] = None
+    content: Optional[str] = None
+    feedback: Optional[str] = None
+
+    # Runs only for values sent in the body, never for the default
+    @field_validator("content")
+    @classmethod
+    def content_not_null(cls, value):
+        if value is None:
+            raise ValueError("content cannot be null")
+        return value
+
+# Journal entry output schemas, built straight from ORM rows
+class EntryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    content: str
+    feedback: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class EntrySearchHit(EntryOut):
+    score: Optional[float] = None
+    snippet: Optional[str] = None
+
+class EntryPage(BaseModel):
+    items: List[EntryOut]
+    next_cursor: Optional[str] = None
+
+# Bulk writes
+class EntryBulkCreate(BaseModel):
+    entries: List[EntryCreate]
+
+class EntryBulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkCreated(BaseModel):
+    created: int
+    ids: List[int] = Field(default_factory=list)
+
+# Imports can run to a million rows, so only the count comes back
+class EntriesImported(BaseModel):
+    created: int
+
+class BulkDeleted(BaseModel):
+    deleted: int
+    ids: List[int]
+
+# One NDJSON line of an import; export lines are accepted as they are
+class EntryImport(EntryCreate):
+    created_at: Optional[datetime] = None
+
+# Projected list rows (?view=summary / ?fields=); only selected fields are sent
+class EntrySummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    created_at: Optional[datetime] = None
+    preview: Optional[str] = None
+    word_count: Optional[int] = None
+    has_feedback: Optional[bool] = None
+
+class EntrySummaryPage(BaseModel):
+    items: List[EntrySummary]
+    next_cursor: Optional[str] = None
+
+# Batch AI feedback request
+class FeedbackBatchRequest(BaseModel):
+    entry_ids: List[int]
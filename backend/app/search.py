@@ -0,0 +1,177 @@
+# app/search.py
+# Full-text search over journal entries.
+#   Postgres: generated, weighted tsvector column with a GIN index
+#   SQLite:   external-content FTS5 table kept in sync by triggers
+
+import html
+import re
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+Entry = models.JournalEntry
+
+# Sentinels the database wraps matched terms in. The snippet is HTML-escaped
+# before they are swapped for <mark> tags, so entry text can't inject markup.
+_HL_START = "\x02"
+_HL_STOP = "\x03"
+
+_PG_SETUP = [
+    """
+    ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_journal_entries_search_vector ON journal_entries USING GIN (search_vector)",
+]
+
+_SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS journal_entries_fts USING fts5(
+        title, content, content='journal_entries', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ai AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_fts_ad AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_fts_au AFTER UPDATE OF title, content ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO journal_entries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+
+def ensure_search_index(engine):
+    # Idempotent; Alembic does the same for managed Postgres databases
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            for statement in _PG_SETUP:
+                conn.execute(text(statement))
+        elif engine.dialect.name == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'journal_entries_fts'")
+            ).first()
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+            if not exists:
+                # Index rows written before the FTS table existed
+                conn.execute(text("INSERT INTO journal_entries_fts(journal_entries_fts) VALUES ('rebuild')"))
+
+
+def _terms(value: str):
+    return re.findall(r"\w+", value or "")
+
+
+def highlight(snippet: str):
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(_HL_START, "<mark>").replace(_HL_STOP, "</mark>")
+
+
+async def search_entries(db: AsyncSession, user_id: int, q: str = None, title: str = None,
+                         filters=(), limit: int = 20, offset: int = 0):
+    """Return (entry, score, snippet) rows, best match first."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return await _search_postgres(db, user_id, q, title, filters, limit, offset)
+    if dialect == "sqlite":
+        return await _search_sqlite(db, user_id, q, title, filters, limit, offset)
+    return await _search_fallback(db, user_id, q, title, filters, limit, offset)
+
+
+async def _search_postgres(db, user_id, q, title, filters, limit, offset):
+    vector = literal_column("journal_entries.search_vector")
+
+    query = None
+    if q:
+        query = func.websearch_to_tsquery("english", q)
+    title_terms = _terms(title)
+    if title_terms:
+        # Prefix-match each term against the weight-A (title) lexemes only
+        title_query = func.to_tsquery("english", " & ".join(f"{t}:*A" for t in title_terms))
+        query = title_query if query is None else query.op("&&")(title_query)
+    if query is None:
+        return []
+
+    score = func.ts_rank_cd(vector, query)
+    page = (
+        select(Entry.id, score.label("score"))
+        .where(Entry.user_id == user_id, vector.op("@@")(query), *filters)
+        .order_by(score.desc(), Entry.created_at.desc(), Entry.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    # ts_headline is costly, so it only runs on the rows of this page
+    snippet = func.ts_headline(
+        "english",
+        Entry.content,
+        query,
+        f"StartSel={_HL_START}, StopSel={_HL_STOP}, MaxWords=24, MinWords=8, MaxFragments=2",
+    )
+    rows = (await db.execute(
+        select(Entry, page.c.score, snippet.label("snippet"))
+        .join(page, page.c.id == Entry.id)
+        .order_by(page.c.score.desc(), Entry.created_at.desc(), Entry.id.desc())
+    )).all()
+    return [(entry, float(s), highlight(snip)) for entry, s, snip in rows]
+
+
+def _fts5_terms(terms):
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+async def _search_sqlite(db, user_id, q, title, filters, limit, offset):
+    parts = []
+    q_terms = _terms(q)
+    if q_terms:
+        parts.append(f"({_fts5_terms(q_terms)})")
+    title_terms = _terms(title)
+    if title_terms:
+        parts.append(f"title : ({_fts5_terms(title_terms)})")
+    if not parts:
+        return []
+
+    fts = table("journal_entries_fts", column("rowid"))
+    fts_ref = literal_column("journal_entries_fts")
+    # bm25 is lower-is-better; title hits weigh double
+    bm25 = func.bm25(fts_ref, 2.0, 1.0)
+    snippet = func.snippet(fts_ref, -1, _HL_START, _HL_STOP, "…", 16)
+
+    rows = (await db.execute(
+        select(Entry, bm25.label("bm25"), snippet.label("snippet"))
+        .join(fts, fts.c.rowid == Entry.id)
+        .where(fts_ref.op("MATCH")(" AND ".join(parts)), Entry.user_id == user_id, *filters)
+        .order_by(bm25, Entry.created_at.desc(), Entry.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )).all()
+    return [(entry, -float(b), highlight(snip)) for entry, b, snip in rows]
+
+
+async def _search_fallback(db, user_id, q, title, filters, limit, offset):
+    # Other databases: unranked substring match
+    query = select(Entry).where(Entry.user_id == user_id, *filters)
+    if q:
+        query = query.where(Entry.content.ilike(f"%{q}%"))
+    if title:
+        query = query.where(Entry.title.ilike(f"%{title}%"))
+    entries = (await db.execute(
+        query.order_by(Entry.created_at.desc(), Entry.id.desc()).limit(limit).offset(offset)
+    )).scalars().all()
+    return [(entry, 0.0, None) for entry in entries]
@@ -0,0 +1,216 @@
+# app/square_events.py
+# Square webhook deliveries are stored by event id as they arrive and
+# applied here in the background. Redeliveries hit the unique event_id and
+# are dropped in the same INSERT, so each event is applied at most once.
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app import auth_cache, models
+from app.config import settings
+from app.database import SessionLocal
+
+PENDING = "pending"
+PROCESSING = "processing"
+PROCESSED = "processed"
+IGNORED = "ignored"
+FAILED = "failed"
+
+Event = models.SquareEvent
+
+_wakeup = asyncio.Event()
+
+
+def notify():
+    _wakeup.set()
+
+
+def _insert_ignoring_duplicates(dialect: str, values: dict):
+    if dialect == "postgresql":
+        return postgresql.insert(Event).values(**values).on_conflict_do_nothing(index_elements=["event_id"])
+    if dialect == "sqlite":
+        return sqlite.insert(Event).values(**values).on_conflict_do_nothing(index_elements=["event_id"])
+    return None
+
+
+async def record(db: AsyncSession, body: bytes) -> bool:
+    """Store a delivery; returns False when the event was already stored.
+
+    Raises ValueError for a body that isn't a JSON object.
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Webhook body must be a JSON object")
+
+    # Square sends a unique event_id; fall back to the body hash so exact
+    # replays are still caught
+    event_id = payload.get("event_id") or hashlib.sha256(body).hexdigest()
+    values = {
+        "event_id": event_id,
+        "event_type": payload.get("type"),
+        "payload": body.decode("utf-8"),
+        "status": PENDING,
+    }
+
+    statement = _insert_ignoring_duplicates(db.get_bind().dialect.name, values)
+    if statement is not None:
+        created = (await db.execute(statement.returning(Event.id))).scalar() is not None
+        await db.commit()
+        return created
+
+    try:
+        await db.execute(insert(Event).values(**values))
+        await db.commit()
+        return True
+    except IntegrityError:
+        await db.rollback()
+        return False
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=settings.square_event_lease_seconds)
+    return or_(
+        and_(Event.status == PENDING, Event.run_after <= now),
+        and_(Event.status == PROCESSING, Event.locked_at < stale),
+    )
+
+
+def claim(db: Session) -> Optional[int]:
+    now = datetime.utcnow()
+
+    if db.get_bind().dialect.name == "postgresql":
+        event = db.execute(
+            select(Event)
+            .where(_claimable(now))
+            .order_by(Event.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if event is None:
+            db.rollback()
+            return None
+
+        event_id = event.id
+        event.status = PROCESSING
+        event.locked_at = now
+        event.attempts += 1
+        db.commit()
+        return event_id
+
+    event_id = db.execute(
+        select(Event.id).where(_claimable(now)).order_by(Event.id).limit(1)
+    ).scalar_one_or_none()
+    if event_id is None:
+        db.rollback()
+        return None
+
+    result = db.execute(
+        update(Event)
+        .where(Event.id == event_id, _claimable(now))
+        .values(status=PROCESSING, locked_at=now, attempts=Event.attempts + 1)
+    )
+    db.commit()
+    return event_id if result.rowcount == 1 else None
+
+
+def _claim_next() -> Optional[int]:
+    db = SessionLocal()
+    try:
+        return claim(db)
+    finally:
+        db.close()
+
+
+def apply(db: Session, payload: dict) -> Optional[int]:
+    # Returns the id of the user upgraded to premium, if any
+    payment = ((payload.get("data") or {}).get("object") or {}).get("payment") or {}
+    email = payment.get("buyer_email_address")
+    if not email:
+        return None
+
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if not user:
+        print(f"No user found with email: {email}")
+        return None
+
+    # Premium starts a fresh quota period: units used on the free plan
+    # don't count against the premium limit
+    user.is_premium = True
+    user.feedback_count = 0
+    user.feedback_window_start = datetime.utcnow()
+    print(f"Upgraded user {email} to premium")
+    return user.id
+
+
+def process(event_row_id: int):
+    # Upgrade and status change commit together
+    db = SessionLocal()
+    try:
+        event = db.get(Event, event_row_id)
+        try:
+            user_id = apply(db, json.loads(event.payload))
+        except Exception as e:
+            db.rollback()
+            event = db.get(Event, event_row_id)
+            event.error = str(e) or type(e).__name__
+            event.locked_at = None
+            if event.attempts >= settings.square_event_max_attempts:
+                event.status = FAILED
+            else:
+                event.status = PENDING
+                delay = settings.square_event_backoff_seconds * 2 ** max(event.attempts - 1, 0)
+                event.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            db.commit()
+            print(f"Square event {event.event_id} attempt {event.attempts} failed: {event.error}")
+            return
+
+        event.status = PROCESSED if user_id is not None else IGNORED
+        event.error = None
+        event.locked_at = None
+        event.processed_at = datetime.utcnow()
+        db.commit()
+        if user_id is not None:
+            auth_cache.invalidate(user_id)
+    finally:
+        db.close()
+
+
+async def processor(name: str):
+    while True:
+        try:
+            event_row_id = await run_in_threadpool(_claim_next)
+        except Exception as e:
+            print(f"Square event processor {name} could not claim an event: {e}")
+            event_row_id = None
+
+        if event_row_id is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.square_event_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+
+        try:
+            await run_in_threadpool(process, event_row_id)
+        except Exception as e:
+            # Event stays 'processing' and is re-claimed once its lease lapses
+            print(f"Square event processor {name} crashed on event {event_row_id}: {e}")
+
+
+def start_processors(count: int):
+    return [asyncio.create_task(processor(f"s{i}")) for i in range(count)]
+
+
+async def stop_processors(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,27 +1,157 @@
-from sendgrid import SendGridAPIClient
+import asyncio
+import json
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+import httpx
+from fastapi.concurrency import run_in_threadpool
 from sendgrid.helpers.mail import Mail
+from app import metrics, models
 from app.config import settings
 
-def send_reset_email(to_email: str, reset_token: str):
-    reset_url = f"http://localhost:5173/reset-password?token={reset_token}"
- 
+# SendGrid accepts up to 1000 personalizations per request
+SENDGRID_MAX_RECIPIENTS = 1000
+
+
+@dataclass(frozen=True)
+class Message:
+    id: int
+    to_email: str
+    subject: str
+    html_content: str
+
 
-    message = Mail(
-        from_email=settings.sendgrid_from_email,
-        to_emails=to_email,
-        subject="Reset Your Nightingale Password",
-        html_content=f"""
+class EmailSendError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[str] = None):
+        super().__init__(f"SendGrid returned {status_code}: {detail}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def reset_email(reset_token: str):
+    reset_url = f"http://localhost:5173/reset-password?token={reset_token}"
+    subject = "Reset Your Nightingale Password"
+    html_content = f"""
             <p>Hello from Nightingale,</p>
             <p>We received a request to reset your password.</p>
             <p>Click the link below to continue:</p>
             <p><a href="{reset_url}">{reset_url}</a></p>
             <p>If you didn’t request this, please disregard this message.</p>
         """
-    )
-
-    try:
-        sg = SendGridAPIClient(settings.sendgrid_api_key)
-        response = sg.send(message)
-        print("Email sent:", response.status_code)
-    except Exception as e:
-        print("SendGrid error:", str(e))
+    return subject, html_content
+
+
+def queue_reset_email(db, to_email: str, reset_token: str):
+    # Added to the caller's transaction; the outbox dispatcher sends it once
+    # that commits. Works with both sync and async sessions.
+    subject, html_content = reset_email(reset_token)
+    db.add(models.EmailOutbox(to_email=to_email, subject=subject, html_content=html_content))
+
+
+# Transports: send_many() returns one error (or None) per message, in order
+
+class SendGridTransport:
+    def __init__(self):
+        # One pooled client for every send in this process
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.email_timeout_seconds, connect=5.0),
+            headers={"Authorization": f"Bearer {settings.sendgrid_api_key}"},
+        )
+
+    async def _send_group(self, subject: str, html_content: str, recipients: List[str]):
+        mail = Mail(
+            from_email=settings.sendgrid_from_email,
+            subject=subject,
+            html_content=html_content,
+        )
+        payload = mail.get()
+        # Each recipient gets their own personalization, so nobody sees the others
+        payload["personalizations"] = [{"to": [{"email": to}]} for to in recipients]
+        try:
+            async with metrics.upstream("sendgrid", "mail.send") as call:
+                response = await self.client.post(settings.sendgrid_api_url, json=payload)
+                if response.status_code >= 400:
+                    call.outcome = f"http_{response.status_code // 100}xx"
+        except httpx.HTTPError as e:
+            metrics.emails_sent.inc(("failed",), len(recipients))
+            return e
+        if response.status_code >= 400:
+            metrics.emails_sent.inc(("failed",), len(recipients))
+            return EmailSendError(response.status_code, response.text, response.headers.get("retry-after"))
+        metrics.emails_sent.inc(("sent",), len(recipients))
+        return None
+
+    async def send_many(self, messages: List[Message]):
+        # Messages with the same subject and body share a request
+        groups = defaultdict(list)
+        for message in messages:
+            groups[(message.subject, message.html_content)].append(message)
+
+        sends = []
+        for (subject, html_content), group in groups.items():
+            for start in range(0, len(group), SENDGRID_MAX_RECIPIENTS):
+                chunk = group[start:start + SENDGRID_MAX_RECIPIENTS]
+                sends.append((chunk, self._send_group(subject, html_content, [m.to_email for m in chunk])))
+
+        outcomes = await asyncio.gather(*(send for _, send in sends))
+        errors = {}
+        for (chunk, _), error in zip(sends, outcomes):
+            for message in chunk:
+                errors[message.id] = error
+        return [errors[message.id] for message in messages]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class MemoryTransport:
+    # Stand-in for tests and local runs: keeps sent messages in `sent`
+    def __init__(self):
+        self.sent: List[Message] = []
+
+    async def send_many(self, messages: List[Message]):
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+    async def aclose(self):
+        pass
+
+
+class FileTransport:
+    # Stand-in for local runs: appends each message to a JSON lines file
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, messages: List[Message]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(asdict(message), ensure_ascii=False) + "\n")
+
+    async def send_many(self, messages: List[Message]):
+        await run_in_threadpool(self._write, messages)
+        return [None] * len(messages)
+
+    async def aclose(self):
+        pass
+
+
+_transport = None
+
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        if settings.email_transport == "memory":
+            _transport = MemoryTransport()
+        elif settings.email_transport == "file":
+            _transport = FileTransport(settings.email_outbox_file)
+        else:
+            _transport = SendGridTransport()
+    return _transport
+
+
+async def aclose():
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
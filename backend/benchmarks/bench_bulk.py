@@ -0,0 +1,55 @@
+"""Creating many entries: one POST /journal each, POST /journal/bulk in
+batches, and a single NDJSON POST /journal/import.
+
+    cd backend
+    python -m benchmarks.bench_bulk --single 500 --entries 100000
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import json
+import time
+
+
+def entry(i: int, words: int) -> dict:
+    return {"title": f"Entry {i}", "content": "Lorem ipsum " * (words // 2)}
+
+
+def report(name: str, count: int, elapsed: float):
+    print(f"{name:<28} {count:>8} entries  {elapsed:>7.2f} s  {count / elapsed:>9.0f} entries/s")
+
+
+async def run(app, single: int, entries: int, batch: int, words: int):
+    async with common.authed_client(app, timeout=None) as (client, headers):
+
+        started = time.perf_counter()
+        for i in range(single):
+            response = await client.post("/journal", json=entry(i, words), headers=headers)
+            response.raise_for_status()
+        report("POST /journal", single, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for offset in range(0, entries, batch):
+            chunk = [entry(i, words) for i in range(offset, min(offset + batch, entries))]
+            response = await client.post("/journal/bulk", json={"entries": chunk}, headers=headers)
+            response.raise_for_status()
+        report(f"POST /journal/bulk x{batch}", entries, time.perf_counter() - started)
+
+        body = "".join(json.dumps(entry(i, words)) + "\n" for i in range(entries)).encode()
+        started = time.perf_counter()
+        response = await client.post("/journal/import", content=body, headers=headers)
+        response.raise_for_status()
+        report("POST /journal/import", response.json()["created"], time.perf_counter() - started)
+
+    await common.close_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--single", type=int, default=500)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=50, help="words of content per entry")
+    args = parser.parse_args()
+    asyncio.run(run(common.load_app(), args.single, args.entries, args.batch, args.words))
@@ -0,0 +1,105 @@
+"""GET /journal/export throughput and peak memory against a seeded journal.
+
+Run each size in its own process; peak RSS never goes down.
+
+    cd backend
+    python -m benchmarks.bench_export --entries 100000 --format ndjson
+    python -m benchmarks.bench_export --entries 100000 --format csv --gzip
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import resource
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(entries: int, words: int):
+    # Straight through Core in large batches; going through the API would
+    # take longer than the export being measured
+    from app import models
+    from app.database import engine
+
+    content = "Lorem ipsum " * (words // 2)
+    start = datetime.utcnow() - timedelta(seconds=entries)
+    with engine.begin() as conn:
+        user_id = conn.execute(select(models.User.id).where(models.User.email == common.EMAIL)).scalar_one()
+        for offset in range(0, entries, 10000):
+            conn.execute(models.JournalEntry.__table__.insert(), [
+                {
+                    "title": f"Entry {i}",
+                    "content": content,
+                    "word_count": words,
+                    "user_id": user_id,
+                    "created_at": start + timedelta(seconds=i),
+                    "updated_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + 10000, entries))
+            ])
+
+
+async def stream_export(app, url: str, authorization: str):
+    # Drives the ASGI app directly: httpx.ASGITransport collects the whole
+    # body before returning it, which would hide whether the server streams
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", authorization.encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status, received, done = None, 0, asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, received
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {url} returned {status}")
+    return received
+
+
+async def run(app, entries: int, words: int, fmt: str, gzip: bool):
+    # Only the bench user and its token are needed; the export itself is
+    # streamed straight through the ASGI app
+    async with common.authed_client(app) as (client, headers):
+        pass
+    seed(entries, words)
+
+    baseline = peak_rss_mb()
+    url = f"/journal/export?format={fmt}&gzip={str(gzip).lower()}"
+    started = time.perf_counter()
+    received = await stream_export(app, url, headers["Authorization"])
+    elapsed = time.perf_counter() - started
+
+    await common.close_app()
+    print(f"{'export ' + fmt + (' gzip' if gzip else ''):<28} {entries:>8} rows  "
+          f"{entries / elapsed:>9.0f} rows/s  {received / 1e6:>8.1f} MB  "
+          f"peak RSS {baseline:.0f} -> {peak_rss_mb():.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=200, help="words of content per entry")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(common.load_app(), args.entries, args.words, args.format, args.gzip))
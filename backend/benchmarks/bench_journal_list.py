@@ -0,0 +1,61 @@
+"""GET /journal latency and throughput, in-process against SQLite.
+
+    cd backend
+    python -m benchmarks.bench_journal_list --requests 2000 --concurrency 50
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import time
+
+
+async def run(app, requests: int, concurrency: int, entries: int, limit: int, view: str, words: int,
+              revalidate: bool):
+    async with common.authed_client(app) as (client, headers):
+        for i in range(entries):
+            await client.post("/journal", json={"title": f"Entry {i}", "content": "Lorem ipsum " * (words // 2)}, headers=headers)
+
+        url = f"/journal?limit={limit}&view={view}"
+        latencies = []
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.get(url, headers=request_headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != expected:
+                    raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+        # Warm up connections and caches before measuring
+        warmup = await client.get(url, headers=headers)
+        page_bytes = len(warmup.content)
+        request_headers, expected = headers, 200
+        if revalidate:
+            # Every request carries the warm-up ETag and should get a 304
+            request_headers, expected = {**headers, "If-None-Match": warmup.headers["etag"]}, 304
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    await common.close_app()
+    name = f"GET /journal {view} x{limit}" + (" (304)" if revalidate else "")
+    common.print_summary(common.summarize(name, latencies, elapsed))
+    print(f"{'response size':<28} {page_bytes:>6} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--view", choices=["full", "summary"], default="full")
+    parser.add_argument("--words", type=int, default=80, help="words of content per entry")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match")
+    args = parser.parse_args()
+    asyncio.run(run(common.load_app(), args.requests, args.concurrency, args.entries, args.limit,
+                    args.view, args.words, args.revalidate))
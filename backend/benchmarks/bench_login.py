@@ -0,0 +1,63 @@
+"""POST /login under a burst, and GET /journal latency while it runs.
+
+    cd backend
+    python -m benchmarks.bench_login --logins 100 --concurrency 20
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import time
+
+
+async def run(app, logins: int, concurrency: int, readers: int):
+    form = {"username": common.EMAIL, "password": common.PASSWORD}
+    async with common.authed_client(app, timeout=120) as (client, headers):
+        await client.get("/journal?limit=10", headers=headers)
+
+        login_latencies, read_latencies, rejected = [], [], 0
+        remaining = logins
+        done = False
+
+        async def login_worker():
+            nonlocal remaining, rejected
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.post("/login", data=form)
+                if response.status_code == 503:
+                    rejected += 1
+                    continue
+                login_latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        async def reader():
+            # Unrelated traffic that shouldn't stall behind bcrypt
+            while not done:
+                start = time.perf_counter()
+                response = await client.get("/journal?limit=10", headers=headers)
+                read_latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        readers_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done = True
+        await asyncio.gather(*readers_tasks)
+
+    await common.close_app()
+
+    common.print_summary(common.summarize("POST /login", login_latencies, elapsed))
+    common.print_summary(common.summarize("GET /journal during burst", read_latencies, elapsed))
+    if rejected:
+        print(f"{'POST /login 503':<28} {rejected:>6} req")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(common.load_app(), args.logins, args.concurrency, args.readers))
@@ -0,0 +1,338 @@
+"""Mixed load across the app, with local fake OpenAI and SendGrid servers.
+
+Seeds accounts whose journals cycle through --sizes, then --users virtual
+users each log in as one of them and run a weighted mix of requests for
+--duration seconds. Feedback waits for its job to finish, so the feedback
+workers and email dispatchers run here as they would under the lifespan.
+Throughput and p50/p95/p99 per endpoint are printed, and --output writes
+them to a JSON baseline that a later run can --compare against.
+
+    cd backend
+    python -m benchmarks.bench_mix --users 20 --duration 30 --output mix-baseline.json
+    python -m benchmarks.bench_mix --users 20 --duration 30 --compare mix-baseline.json
+
+Runs on a throwaway SQLite file by default; set DATABASE_URL to a local
+Postgres to run against that instead (accounts get fresh emails per run).
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import httpx
+from benchmarks.fakes import FakeUpstreams
+
+OPERATIONS = ("login", "list", "search", "create", "feedback", "stream", "forgot")
+DEFAULT_MIX = "login=5,list=35,search=20,create=20,feedback=10,stream=5,forgot=5"
+
+WORDS = (
+    "morning walk coffee work meeting deadline friend family dinner sleep tired "
+    "grateful anxious calm rain sunshine garden book music run gym project call "
+    "weekend travel cooking stress progress goal habit journal reflection quiet"
+).split()
+
+JOB_POLL_SECONDS = 0.1
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def entry(rng: random.Random, words: int) -> dict:
+    return {
+        "title": " ".join(rng.choices(WORDS, k=3)).capitalize(),
+        "content": " ".join(rng.choices(WORDS, k=words)),
+    }
+
+
+class Recorder:
+    # Only requests that finish inside the measured window count, so slow
+    # stragglers at the end don't stretch the window and skew throughput
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, name: str, status: int, seconds: float):
+        if not self.start <= time.perf_counter() <= self.end:
+            return
+        self.statuses[name][status] += 1
+        if status < 400:
+            self.latencies[name].append(seconds)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.add(name, response.status_code, time.perf_counter() - start)
+        return response
+
+    def summaries(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.statuses):
+            statuses = self.statuses[name]
+            latencies = self.latencies[name]
+            summary = common.summarize(name, latencies, elapsed) if latencies else {"name": name, "requests": 0}
+            summary["errors"] = sum(count for status, count in statuses.items() if status >= 400)
+            summary["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+            endpoints[name] = summary
+        return endpoints
+
+
+class Account:
+    def __init__(self, email: str, entry_ids):
+        self.email = email
+        self.entry_ids = list(entry_ids)
+
+
+async def seed(client: httpx.AsyncClient, accounts: int, sizes, words: int, run_id: str, rng: random.Random):
+    seeded = []
+    batch = 1000
+    for i in range(accounts):
+        email = f"bench-{run_id}-{i}@example.com"
+        (await client.post("/register", json={"email": email, "password": "bench-pass"})).raise_for_status()
+        login = await client.post("/login", data={"username": email, "password": "bench-pass"})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        ids = []
+        size = sizes[i % len(sizes)]
+        for offset in range(0, size, batch):
+            chunk = [entry(rng, words) for _ in range(min(batch, size - offset))]
+            response = await client.post("/journal/bulk", json={"entries": chunk}, headers=headers)
+            response.raise_for_status()
+            ids.extend(response.json()["ids"])
+        seeded.append(Account(email, ids))
+    return seeded
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, account: Account, words: int, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.account = account
+        self.words = words
+        self.rng = rng
+        self.headers = {}
+        # Entries this user wrote and hasn't asked feedback for yet
+        self.fresh = []
+
+    async def login(self):
+        response = await self.recorder.request(
+            self.client, "POST /login", "POST", "/login",
+            data={"username": self.account.email, "password": "bench-pass"},
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def list(self):
+        await self.recorder.request(self.client, "GET /journal", "GET", "/journal?limit=20", headers=self.headers)
+
+    async def search(self):
+        await self.recorder.request(
+            self.client, "GET /journal/search", "GET", "/journal/search",
+            params={"q": self.rng.choice(WORDS)}, headers=self.headers,
+        )
+
+    async def create(self):
+        response = await self.recorder.request(
+            self.client, "POST /journal", "POST", "/journal", json=entry(self.rng, self.words), headers=self.headers
+        )
+        if response.status_code == 200:
+            self.fresh.append(response.json()["id"])
+
+    def _feedback_target(self):
+        # New entries go to OpenAI; seeded ones repeat and mostly hit the cache
+        if self.fresh:
+            return self.fresh.pop()
+        if self.account.entry_ids:
+            return self.rng.choice(self.account.entry_ids)
+        return None
+
+    async def feedback(self):
+        entry_id = self._feedback_target()
+        if entry_id is None:
+            return
+        start = time.perf_counter()
+        response = await self.recorder.request(
+            self.client, "POST /ai-feedback/{entry_id}", "POST", f"/ai-feedback/{entry_id}", headers=self.headers
+        )
+        if response.status_code != 202:
+            return
+
+        status_url = response.json()["status_url"]
+        # Jobs still running at the deadline aren't waited for
+        while time.perf_counter() < self.recorder.end:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            job = await self.recorder.request(
+                self.client, "GET /ai-feedback/jobs/{job_id}", "GET", status_url, headers=self.headers
+            )
+            if job.status_code != 200:
+                return
+            status = job.json()["status"]
+            if status in ("done", "failed"):
+                self.recorder.add("feedback job (end to end)", 200 if status == "done" else 502,
+                                  time.perf_counter() - start)
+                return
+
+    async def stream(self):
+        entry_id = self._feedback_target()
+        if entry_id is None:
+            return
+        # ASGITransport hands over the body once the stream has finished, so
+        # this is time to the whole reply; upstream failures arrive as an
+        # error event in a 200
+        start = time.perf_counter()
+        response = await self.client.post(f"/ai-feedback/{entry_id}/stream", headers=self.headers)
+        failed = response.status_code >= 400 or "event: error" in response.text
+        self.recorder.add("POST /ai-feedback/{entry_id}/stream", 502 if failed and response.status_code < 400
+                          else response.status_code, time.perf_counter() - start)
+
+    async def forgot(self):
+        await self.recorder.request(
+            self.client, "POST /forgot-password", "POST", "/forgot-password", json={"email": self.account.email}
+        )
+
+    async def run(self, mix: dict):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        await self.login()
+        while time.perf_counter() < self.recorder.end:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pct_change(old, new):
+    if not old or new is None:
+        return "     n/a"
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def compare(baseline: dict, result: dict):
+    if baseline.get("config") != result["config"]:
+        print("Note: baseline was run with a different config:", json.dumps(baseline.get("config")))
+    print(f"\nvs baseline {baseline.get('git_commit') or '?'} ({baseline.get('created_at')})")
+    print(f"{'':<32} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, new in result["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if old is None:
+            print(f"{name:<32} (not in baseline)")
+            continue
+        print(
+            f"{name:<32} "
+            + " ".join(pct_change(old.get(key), new.get(key)) for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"))
+        )
+
+
+async def run(app, fake: FakeUpstreams, args):
+    from app import ai_service, email_outbox, feedback_jobs, feedback_service
+    from app.database import engine
+
+    rng = random.Random(args.seed)
+    fake.start()
+    # What the lifespan would start; ASGITransport doesn't run it
+    workers = feedback_jobs.start_workers(args.feedback_workers)
+    dispatchers = email_outbox.start_dispatchers(1)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        accounts = await seed(client, args.accounts, args.sizes, args.words, uuid.uuid4().hex[:8], rng)
+        print(f"Seeded {len(accounts)} accounts, {sum(len(a.entry_ids) for a in accounts)} entries "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        measured = time.perf_counter() + args.warmup
+        recorder = Recorder(measured, measured + args.duration)
+        users = [
+            VirtualUser(client, recorder, accounts[i % len(accounts)], args.words, random.Random(args.seed + i + 1))
+            for i in range(args.users)
+        ]
+        await asyncio.gather(*(user.run(args.mix) for user in users))
+
+    await feedback_jobs.stop_workers(workers)
+    # Shielded upstream calls outlive the workers; let them finish before
+    # the fake server goes away
+    await asyncio.gather(*list(feedback_service._inflight.values()), return_exceptions=True)
+    await email_outbox.stop_dispatchers(dispatchers)
+    await ai_service.aclose()
+    fake.stop()
+    await common.close_app()
+
+    result = {
+        "benchmark": "mix",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "config": {
+            "users": args.users, "duration": args.duration, "mix": args.mix, "accounts": args.accounts,
+            "sizes": args.sizes, "words": args.words, "feedback_workers": args.feedback_workers,
+            "openai_latency": args.openai_latency, "sendgrid_latency": args.sendgrid_latency,
+            "jitter": args.jitter, "error_rate": args.error_rate, "seed": args.seed,
+        },
+        "endpoints": recorder.summaries(args.duration),
+        "upstream": fake.snapshot(),
+    }
+
+    for summary in result["endpoints"].values():
+        if summary["requests"]:
+            common.print_summary(summary)
+        if summary["errors"]:
+            print(f"{'':<28} {summary['errors']:>6} errors  {summary['statuses']}")
+    print(f"{'upstream calls':<28} {result['upstream']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds run before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"weights, default {DEFAULT_MIX}")
+    parser.add_argument("--accounts", type=int, default=12)
+    parser.add_argument("--sizes", type=lambda text: [int(size) for size in text.split(",")], default="10,100,1000",
+                        help="journal sizes the seeded accounts cycle through")
+    parser.add_argument("--words", type=int, default=80, help="words of content per entry")
+    parser.add_argument("--feedback-workers", type=int, default=2)
+    parser.add_argument("--openai-latency", type=float, default=0.8, help="seconds per fake completion")
+    parser.add_argument("--sendgrid-latency", type=float, default=0.1, help="seconds per fake send")
+    parser.add_argument("--jitter", type=float, default=0.25, help="latency varies by this fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake upstream calls that 500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    # Quotas would stop the feedback mix after a few calls per account
+    os.environ.setdefault("FEEDBACK_LIMIT_FREE", "-1")
+    fake = FakeUpstreams(args.openai_latency, args.sendgrid_latency, args.jitter, args.error_rate, args.seed)
+    fake.configure_env()
+    asyncio.run(run(common.load_app(), fake, args))
@@ -0,0 +1,63 @@
+"""Serializing one page of journal entries: the old dict + jsonable_encoder
+path against app.responses.model_response.
+
+    cd backend
+    python -m benchmarks.bench_serialization --entries 100 --rounds 2000
+"""
+from benchmarks import common
+
+import argparse
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+
+def legacy(entries):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    content = [
+        {
+            "id": entry.id,
+            "title": entry.title,
+            "content": entry.content,
+            "feedback": entry.feedback,
+            "created_at": entry.created_at
+        }
+        for entry in entries
+    ]
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def typed(entries):
+    from app.responses import model_response
+    from app.schemas import EntryOut
+    return model_response(List[EntryOut], entries).body
+
+
+def run(entries: int, rounds: int):
+    rows = [
+        SimpleNamespace(
+            id=i,
+            title=f"Entry {i}",
+            content="Went for a long walk and thought about the week. " * 8,
+            feedback="Consider writing a little more about how the walk felt. " * 4,
+            created_at=datetime.utcnow(),
+        )
+        for i in range(entries)
+    ]
+    for name, render in (("legacy", legacy), ("model_response", typed)):
+        render(rows)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            render(rows)
+        per_page = (time.perf_counter() - started) / rounds * 1e6
+        print(f"{name:<28} {per_page:>8.0f} us/page  ({len(render(rows))} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.entries, args.rounds)
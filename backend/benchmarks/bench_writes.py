@@ -0,0 +1,73 @@
+"""SQL statements and latency per journal write: POST, PUT, PATCH and
+DELETE /journal. Statements are counted on the async engine, so auth
+lookups served from the auth cache don't show up.
+
+    cd backend
+    python -m benchmarks.bench_writes --writes 500
+"""
+from benchmarks import common
+
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import event
+
+
+async def run(app, writes: int):
+    from app.database import async_engine
+
+    statements = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement.split(None, 1)[0].upper())
+    )
+
+    async with common.authed_client(app) as (client, headers):
+        await client.get("/journal", headers=headers)
+
+        ids = []
+
+        def create(i):
+            return client.post("/journal", json={"title": f"Entry {i}", "content": "Lorem ipsum " * 40}, headers=headers)
+
+        def put(i):
+            return client.put(f"/journal/{ids[i]}", json={"title": "Edited", "content": "Lorem ipsum " * 41}, headers=headers)
+
+        def patch(i):
+            return client.patch(f"/journal/{ids[i]}", json={"title": "Renamed"}, headers=headers)
+
+        def remove(i):
+            return client.delete(f"/journal/{ids[i]}", headers=headers)
+
+        for name, send in (("POST", create), ("PUT", put), ("PATCH", patch), ("DELETE", remove)):
+            latencies, counts, kinds = [], [], {}
+            for i in range(writes):
+                statements.clear()
+                start = time.perf_counter()
+                response = await send(i)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code == 405:
+                    break
+                response.raise_for_status()
+                if name == "POST":
+                    ids.append(response.json()["id"])
+                counts.append(len(statements))
+                for kind in statements:
+                    kinds[kind] = kinds.get(kind, 0) + 1
+            if not counts:
+                print(f"{name + ' /journal':<28} not supported")
+                continue
+            summary = common.summarize(f"{name} /journal", latencies, sum(latencies))
+            common.print_summary(summary)
+            per_write = ", ".join(f"{kind} {n / len(counts):g}" for kind, n in sorted(kinds.items()))
+            print(f"{'':<28} {statistics.fmean(counts):g} statements per write ({per_write})")
+
+    await common.close_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(common.load_app(), args.writes))
@@ -0,0 +1,83 @@
+# benchmarks/common.py
+# Shared setup for the in-process benchmarks. Import this before anything
+# from `app` so throwaway settings are in place.
+
+import os
+import statistics
+import tempfile
+from contextlib import asynccontextmanager
+import httpx
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "nightingale_bench.db")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("SENDGRID_API_KEY", "SG.bench")
+os.environ.setdefault("SENDGRID_FROM_EMAIL", "bench@nightingale.ai")
+os.environ.setdefault("FEEDBACK_WORKERS", "0")
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-pass"
+
+
+def reset_db():
+    # Only ever removes the default throwaway database
+    if os.environ["DATABASE_URL"] == f"sqlite:///{BENCH_DB}" and os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+
+
+def load_app():
+    # Called from the __main__ guard: password hashing workers are spawned
+    # processes that re-import the benchmark module, and must not reset the
+    # database or build another app
+    reset_db()
+    from main import app
+    return app
+
+
+async def close_app():
+    # ASGITransport doesn't run the lifespan, so release what it would
+    from app import password_hashing
+    from app.database import async_engine
+    await async_engine.dispose()
+    password_hashing.shutdown()
+
+
+@asynccontextmanager
+async def authed_client(app, **options):
+    # An in-process client logged in as the bench user; yields the client
+    # and its auth headers. `options` go to httpx.AsyncClient (e.g. timeout)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", **options) as client:
+        await client.post("/register", json={"email": EMAIL, "password": PASSWORD})
+        login = await client.post("/login", data={"username": EMAIL, "password": PASSWORD})
+        login.raise_for_status()
+        yield client, {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed):
+    ms = [v * 1000 for v in latencies]
+    return {
+        "name": name,
+        "requests": len(ms),
+        "throughput_rps": round(len(ms) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(ms), 2),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+    }
+
+
+def print_summary(summary):
+    print(
+        f"{summary['name']:<28} {summary['requests']:>6} req  "
+        f"{summary['throughput_rps']:>8} req/s  "
+        f"p50 {summary['p50_ms']:>7} ms  p95 {summary['p95_ms']:>7} ms  p99 {summary['p99_ms']:>7} ms"
+    )
@@ -0,0 +1,122 @@
+"""Local stand-ins for OpenAI and SendGrid with injected latency.
+
+Both are served from one Starlette app by uvicorn in a background thread
+with its own event loop, so their sleeps don't run on the loop being
+measured. Bind before loading the app, since settings are read at import:
+
+    fake = FakeUpstreams(openai_latency=0.8, sendgrid_latency=0.1)
+    fake.configure_env()      # OPENAI_BASE_URL, SENDGRID_API_URL
+    app = common.load_app()
+    fake.start()
+    ...
+    fake.stop()
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+REPLY = "Thank you for sharing this. It sounds like today asked a lot of you, and noticing that is a good first step."
+
+
+class FakeUpstreams:
+    def __init__(self, openai_latency: float = 0.8, sendgrid_latency: float = 0.1,
+                 jitter: float = 0.25, error_rate: float = 0.0, seed: int = 0):
+        # Each call sleeps latency * (1 +/- jitter); error_rate of them fail with a 500
+        self.openai_latency = openai_latency
+        self.sendgrid_latency = sendgrid_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.emails = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+
+        app = Starlette(routes=[
+            Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/v3/mail/send", self.mail_send, methods=["POST"]),
+        ])
+        config = uvicorn.Config(app, log_level="warning", access_log=False, lifespan="off")
+        self.server = uvicorn.Server(config)
+        self.thread = None
+
+    def configure_env(self):
+        os.environ["OPENAI_BASE_URL"] = f"{self.url}/v1"
+        os.environ["SENDGRID_API_URL"] = f"{self.url}/v3/mail/send"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.socket]}, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def snapshot(self) -> dict:
+        return {"calls": dict(self.calls), "emails": self.emails}
+
+    async def _delay(self, latency: float) -> bool:
+        # Returns False when this call should fail
+        await asyncio.sleep(max(0.0, latency * (1 + self.random.uniform(-self.jitter, self.jitter))))
+        return self.random.random() >= self.error_rate
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        stream = bool(body.get("stream"))
+        self.calls["openai.stream" if stream else "openai"] += 1
+        if not await self._delay(self.openai_latency):
+            self.calls["openai.error"] += 1
+            return JSONResponse({"error": {"message": "injected failure", "type": "server_error"}}, status_code=500)
+
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        words = REPLY.split(" ")
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "gpt-3.5-turbo")}
+
+        if not stream:
+            return JSONResponse({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": REPLY}}],
+                "usage": usage,
+            })
+
+        async def chunks():
+            for i, word in enumerate(words):
+                delta = {"content": word if i == 0 else " " + word}
+                yield "data: " + json.dumps({**base, "object": "chat.completion.chunk",
+                                              "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}) + "\n\n"
+                await asyncio.sleep(0)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield "data: " + json.dumps({**base, "object": "chat.completion.chunk",
+                                              "choices": [], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    async def mail_send(self, request):
+        body = await request.json()
+        self.calls["sendgrid"] += 1
+        if not await self._delay(self.sendgrid_latency):
+            self.calls["sendgrid.error"] += 1
+            return JSONResponse({"errors": [{"message": "injected failure"}]}, status_code=500)
+        self.emails += len(body.get("personalizations", []))
+        return Response(status_code=202)
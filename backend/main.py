@@ -1,25 +1,50 @@
 # backend/app/main.py
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from fastapi import Request
 from app.database import SessionLocal 
-from app.database import engine, SessionLocal
-from app import models
+from app.database import engine, async_engine, SessionLocal, get_async_db
+from app import models, search
 from app.journal_routes import journal_router
 from app.auth_routes import auth_router, get_current_user
 from app.ai_routes import router as ai_router
+from app.internal_routes import internal_router, require_internal_token
+from app import ai_service, auth_cache, conditional, email_outbox, feedback_jobs, metrics, password_hashing, query_stats, square_events
 from app.models import User
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer
-import json
+from contextlib import asynccontextmanager
+from app.config import settings
 
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
-from app.config import settings
+search.ensure_search_index(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In-process AI feedback workers; set FEEDBACK_WORKERS=0 when running worker.py instead
+    workers = feedback_jobs.start_workers(settings.feedback_workers)
+    # Outbox dispatchers; set EMAIL_WORKERS=0 when running worker.py instead
+    dispatchers = email_outbox.start_dispatchers(settings.email_workers)
+    # Square webhook processors; set SQUARE_EVENT_WORKERS=0 when running worker.py instead
+    processors = square_events.start_processors(settings.square_event_workers)
+    password_hashing.start()
+    yield
+    password_hashing.shutdown()
+    await square_events.stop_processors(processors)
+    await email_outbox.stop_dispatchers(dispatchers)
+    await feedback_jobs.stop_workers(workers)
+    # Release pooled upstream connections on shutdown
+    await ai_service.aclose()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 print("DEBUG DB URL:", settings.database_url)
 
 
@@ -37,10 +62,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request SQL counts, slow-query log and N+1 warnings
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
+# Request counts, latency histograms and in-flight gauge; added last so it
+# is outermost and its timings include the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(journal_router)
 app.include_router(auth_router)
 app.include_router(ai_router)
+app.include_router(internal_router)
 
 # Dependency for DB session
 def get_db():
@@ -54,43 +87,41 @@ def get_db():
 class JournalCreate(BaseModel):
     content: str
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"message": "Hello from Nightingale backend!"}
 
-@app.get("/me")
-def get_current_user_data(current_user: User = Depends(get_current_user)):
-    return {
+@app.get("/me", dependencies=[Depends(query_stats.budget(1))])
+def get_current_user_data(request: Request, current_user: auth_cache.CurrentUser = Depends(get_current_user)):
+    tag = conditional.etag(
+        "me", current_user.id, current_user.email, current_user.is_premium, current_user.feedback_count
+    )
+    if conditional.is_fresh(request, tag):
+        return conditional.not_modified(tag)
+
+    return JSONResponse({
         "email": current_user.email,
         "is_premium": current_user.is_premium,
         "feedback_count": current_user.feedback_count  
-    }
+    }, headers=conditional.headers(tag))
 
 
 # Webhook Square
+# Stores the delivery and acknowledges straight away; square_events applies
+# it in the background. Redeliveries of a stored event are dropped.
 @app.post("/webhook/square")
-async def square_webhook(request: Request):
-    payload = await request.json()
-    print("Webhook received from Square:")
-    print(json.dumps(payload, indent=2))
-
+async def square_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
+    body = await request.body()
     try:
-        email = payload["data"]["object"]["payment"]["buyer_email_address"]
-
-        db: Session = SessionLocal()
-        user = db.query(User).filter(User.email == email).first()
+        created = await square_events.record(db, body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
 
-        if user:
-            user.is_premium = True
-            user.feedback_count = 0
-            db.commit()
-            print(f"Upgraded user {email} to premium")
-        else:
-            print(f"No user found with email: {email}")
-
-    except Exception as e:
-        print(f"Error processing webhook: {e}")
+    if created:
+        square_events.notify()
 
     return {"status": "ok"}
-
-
@@ -0,0 +1,105 @@
+# tests/conftest.py
+# The app against a throwaway SQLite file, with background workers off and
+# cheap bcrypt. Settings are read at import, so the environment is set
+# before anything from `app` is imported.
+#
+# Query budgets: requests made inside a `query_budget` block fail the test
+# when they run more statements than allowed, listing what they ran.
+#
+#   def test_list(client, auth_headers, query_budget):
+#       with query_budget():          # each route's declared budget
+#           client.get("/journal", headers=auth_headers)
+#       with query_budget(2):         # or an explicit cap per request
+#           client.get("/me", headers=auth_headers)
+
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+TEST_DB = os.path.join(tempfile.mkdtemp(prefix="nightingale-tests-"), "test.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SENDGRID_API_KEY", "SG.test")
+os.environ.setdefault("SENDGRID_FROM_EMAIL", "test@nightingale.ai")
+os.environ.setdefault("EMAIL_TRANSPORT", "memory")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+for workers in ("FEEDBACK_WORKERS", "EMAIL_WORKERS", "SQUARE_EVENT_WORKERS"):
+    os.environ.setdefault(workers, "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import query_stats
+
+
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import app
+    from app.database import async_engine, engine
+    # SQLite ignores ON DELETE unless asked, and Postgres always applies it
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "connect", _enforce_foreign_keys)
+    engine.dispose()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    # Not entered as a context manager, so the lifespan (and its workers)
+    # doesn't run
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    # A fresh user per test, so quotas and journals don't leak between tests
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    client.post("/register", json={"email": email, "password": "test-pass"}).raise_for_status()
+    login = client.post("/login", data={"username": email, "password": "test-pass"})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    # Warm the auth cache so budgets measure the route, not the user load
+    client.get("/me", headers=headers).raise_for_status()
+    return headers
+
+
+@pytest.fixture
+def create_entry(client, auth_headers):
+    # Creates an entry for `auth_headers`' user and returns its id
+    def create(title: str = "Morning", content: str = "Coffee and a walk") -> int:
+        response = client.post("/journal", json={"title": title, "content": content}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()["id"]
+    return create
+
+
+def _report(queries: query_stats.RequestQueries, limit: int) -> str:
+    lines = [f"{queries.name} ran {queries.count} queries, budget {limit}:"]
+    for statement, count in queries.statements.most_common():
+        lines.append(f"  {count}x {query_stats.preview(statement)}")
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(limit: Optional[int] = None):
+        with query_stats.capture() as requests:
+            yield requests
+        failures = []
+        for queries in requests:
+            allowed = limit if limit is not None else queries.budget
+            if allowed is not None and queries.count > allowed:
+                failures.append(_report(queries, allowed))
+        if failures:
+            pytest.fail("\n\n".join(failures), pytrace=False)
+    return budget
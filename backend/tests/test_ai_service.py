@@ -0,0 +1,76 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from app import ai_service
+from app.config import settings
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+async def collect(title="Title", content="Content"):
+    return [delta async for delta in ai_service.stream_feedback(title, content)]
+
+
+def test_stream_waiting_on_a_full_gate_times_out(monkeypatch):
+    monkeypatch.setattr(settings, "openai_timeout_seconds", 0.05)
+
+    async def saturated():
+        monkeypatch.setattr(ai_service, "upstream_gate", asyncio.Semaphore(0))
+        await collect()
+
+    started = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        # The outer bound only stops a hang; the stream's own deadline fires first
+        asyncio.run(asyncio.wait_for(saturated(), timeout=2))
+    assert time.perf_counter() - started < 1
+
+
+def test_stream_releases_its_gate_slot(monkeypatch):
+    chunk = SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="Hello"))])
+    stream = FakeStream([chunk])
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    monkeypatch.setattr(ai_service.client.chat.completions, "create", create)
+
+    async def run():
+        gate = asyncio.Semaphore(1)
+        monkeypatch.setattr(ai_service, "upstream_gate", gate)
+        assert await collect() == ["Hello"]
+        return gate.locked()
+
+    assert asyncio.run(run()) is False
+    assert stream.closed
+
+
+def test_stream_releases_its_gate_slot_when_opening_fails(monkeypatch):
+    async def create(**kwargs):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(ai_service.client.chat.completions, "create", create)
+
+    async def run():
+        gate = asyncio.Semaphore(1)
+        monkeypatch.setattr(ai_service, "upstream_gate", gate)
+        with pytest.raises(RuntimeError):
+            await collect()
+        return gate.locked()
+
+    assert asyncio.run(run()) is False
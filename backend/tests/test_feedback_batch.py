@@ -0,0 +1,88 @@
+import uuid
+import pytest
+from sqlalchemy.orm import Session
+from app import feedback_cache, feedback_service, models
+from app.database import SessionLocal
+
+
+def create_days(create_entry, count):
+    return [create_entry(title=f"Day {i}", content=f"Notes for day {i}") for i in range(count)]
+
+
+def cache_feedback(ids):
+    # Durable cache rows only, as after a restart
+    db = SessionLocal()
+    try:
+        for entry in db.query(models.JournalEntry).filter(models.JournalEntry.id.in_(ids)):
+            key = feedback_cache.cache_key(entry.title, entry.content)
+            db.merge(models.FeedbackCache(key=key, feedback=f"Feedback for {entry.title}"))
+        db.commit()
+    finally:
+        db.close()
+    feedback_cache.memory.clear()
+
+
+def test_batch_reads_cache_rows_in_one_query(client, auth_headers, create_entry, query_budget):
+    ids = create_days(create_entry, 5)
+    cache_feedback(ids)
+
+    with query_budget() as requests:
+        response = client.post("/ai-feedback/batch", json={"entry_ids": ids}, headers=auth_headers)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["feedback"] for result in results] == [f"Feedback for Day {i}" for i in range(5)]
+    assert all(result["cached"] for result in results)
+
+    ran = list(requests[0].statements.elements())
+    assert sum("FROM ai_feedback_cache" in statement for statement in ran) == 1
+    assert not requests[0].repeated()
+
+
+def test_batch_serves_memory_hits_without_querying_the_cache(client, auth_headers, create_entry, query_budget):
+    ids = create_days(create_entry, 3)
+    cache_feedback(ids)
+    client.post("/ai-feedback/batch", json={"entry_ids": ids}, headers=auth_headers)
+
+    with query_budget() as requests:
+        response = client.post("/ai-feedback/batch", json={"entry_ids": ids}, headers=auth_headers)
+
+    assert all(result["cached"] for result in response.json()["results"])
+    assert not any("ai_feedback_cache" in statement for statement in requests[0].statements)
+
+
+def entry_and_key(create_entry):
+    # Content unique to the test, so no other test shares its cache key
+    entry_id = create_entry(title="Today", content=uuid.uuid4().hex)
+    db = SessionLocal()
+    try:
+        entry = db.get(models.JournalEntry, entry_id)
+        user_id, key = entry.user_id, feedback_cache.cache_key(entry.title, entry.content)
+    finally:
+        db.close()
+    return entry_id, user_id, key
+
+
+def test_saved_feedback_is_remembered_after_commit(create_entry):
+    entry_id, user_id, key = entry_and_key(create_entry)
+    assert feedback_service.save_feedback(entry_id, user_id, "Well done", key)
+    assert feedback_cache.memory.get(key) == "Well done"
+
+
+def test_rolled_back_feedback_is_not_remembered(create_entry, monkeypatch):
+    entry_id, user_id, key = entry_and_key(create_entry)
+
+    def failing_commit(self):
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(Session, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        feedback_service.save_feedback(entry_id, user_id, "Never saved", key)
+    monkeypatch.undo()
+
+    assert feedback_cache.memory.get(key) is None
+    db = SessionLocal()
+    try:
+        assert feedback_cache.lookup(db, key) is None
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+import uuid
+from app import feedback_jobs, models
+from app.database import SessionLocal
+
+
+def queue_job(client, headers, create_entry):
+    # Unique content, so the job isn't answered from the feedback cache
+    entry_id = create_entry(content=uuid.uuid4().hex)
+    response = client.post(f"/ai-feedback/{entry_id}", headers=headers)
+    assert response.status_code == 202
+    return entry_id, response.json()["job_id"]
+
+
+def feedback_count(client, headers) -> int:
+    return client.get("/me", headers=headers).json()["feedback_count"]
+
+
+def job_state(job_id):
+    db = SessionLocal()
+    try:
+        job = db.get(models.FeedbackJob, job_id)
+        return job.status, job.error, job.charge
+    finally:
+        db.close()
+
+
+def delete_entry(client, headers, entry_id):
+    assert client.delete(f"/journal/{entry_id}", headers=headers).status_code == 200
+
+
+def test_deleting_an_entry_with_a_queued_job_refunds_it(client, auth_headers, create_entry):
+    entry_id, job_id = queue_job(client, auth_headers, create_entry)
+    assert feedback_count(client, auth_headers) == 1
+
+    # The delete clears the job's entry_id rather than deleting the job
+    delete_entry(client, auth_headers, entry_id)
+    assert feedback_jobs._load(job_id) is None
+
+    assert job_state(job_id) == (feedback_jobs.FAILED, "Journal entry not found", False)
+    assert feedback_count(client, auth_headers) == 0
+
+
+def test_entry_deleted_while_the_job_runs_is_refunded_on_complete(client, auth_headers, create_entry):
+    entry_id, job_id = queue_job(client, auth_headers, create_entry)
+    key = feedback_jobs._load(job_id)[3]
+
+    delete_entry(client, auth_headers, entry_id)
+    feedback_jobs._complete(job_id, "Lovely day", key, True)
+
+    assert job_state(job_id) == (feedback_jobs.FAILED, "Journal entry not found", False)
+    assert feedback_count(client, auth_headers) == 0
+
+
+def test_entry_deleted_before_a_retry_fails_the_job(client, auth_headers, create_entry):
+    entry_id, job_id = queue_job(client, auth_headers, create_entry)
+
+    delete_entry(client, auth_headers, entry_id)
+    feedback_jobs._fail(job_id, "Request timed out", retry_in=5.0)
+
+    assert job_state(job_id) == (feedback_jobs.FAILED, "Journal entry not found", False)
+    assert feedback_count(client, auth_headers) == 0
+
+
+def test_missing_job_is_ignored():
+    assert feedback_jobs._load(999999) is None
+    feedback_jobs._complete(999999, "Lovely day", "key", True)
+    feedback_jobs._fail(999999, "Request timed out", retry_in=None)
@@ -0,0 +1,103 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, update
+from app import auth_cache, models, quota
+from app.config import settings
+from app.database import SessionLocal, engine
+
+
+def feedback_count(client, headers) -> int:
+    return client.get("/me", headers=headers).json()["feedback_count"]
+
+
+def use_up_quota_but_one(client, headers) -> int:
+    limit = settings.feedback_limit_free
+    user_id = auth_cache.user_id_for_token(headers["Authorization"].split(" ", 1)[1])
+    db = SessionLocal()
+    try:
+        quota.reserve(db, user_id, limit, limit - 1)
+    finally:
+        db.close()
+    assert feedback_count(client, headers) == limit - 1
+    return limit
+
+
+def test_repeat_click_joins_the_job_without_charging_again(client, auth_headers, create_entry):
+    limit = use_up_quota_but_one(client, auth_headers)
+    entry_id = create_entry()
+
+    first = client.post(f"/ai-feedback/{entry_id}", headers=auth_headers)
+    second = client.post(f"/ai-feedback/{entry_id}", headers=auth_headers)
+
+    assert first.status_code == 202
+    assert second.status_code == 202
+    assert second.json()["job_id"] == first.json()["job_id"]
+    assert feedback_count(client, auth_headers) == limit
+
+
+def test_new_job_over_the_limit_is_refused(client, auth_headers, create_entry):
+    limit = use_up_quota_but_one(client, auth_headers)
+    first = create_entry(title="One")
+    second = create_entry(title="Two")
+
+    assert client.post(f"/ai-feedback/{first}", headers=auth_headers).status_code == 202
+    assert client.post(f"/ai-feedback/{second}", headers=auth_headers).status_code == 403
+    assert feedback_count(client, auth_headers) == limit
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post("/register", json={"email": f"quota-{uuid.uuid4().hex[:12]}@example.com", "password": "test-pass"})
+    return response.json()["id"]
+
+
+def count_for(user_id) -> int:
+    db = SessionLocal()
+    try:
+        return db.get(models.User, user_id).feedback_count
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def statements():
+    ran = []
+
+    def record(conn, cursor, statement, *args):
+        ran.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield ran
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize("used, wanted, granted", [(0, 2, 2), (0, 3, 3), (1, 5, 2), (3, 1, 0), (0, 0, 0)])
+def test_reserve_up_to_grants_what_fits_in_one_statement(user_id, statements, used, wanted, granted):
+    db = SessionLocal()
+    try:
+        if used:
+            assert quota.reserve(db, user_id, 3, used) == used
+        statements.clear()
+        assert quota.reserve_up_to(db, user_id, 3, wanted) == granted
+        assert len(statements) == (1 if wanted else 0)
+    finally:
+        db.close()
+    assert count_for(user_id) == used + granted
+
+
+def test_reserve_up_to_restarts_an_expired_window(user_id, monkeypatch):
+    db = SessionLocal()
+    try:
+        assert quota.reserve(db, user_id, 3, 3) == 3
+        db.execute(
+            update(models.User).where(models.User.id == user_id)
+            .values(feedback_window_start=datetime.utcnow() - timedelta(days=31))
+        )
+        db.commit()
+        monkeypatch.setattr(settings, "feedback_quota_window_days", 30)
+        assert quota.reserve_up_to(db, user_id, 3, 5) == 3
+        assert quota.reserve_up_to(db, user_id, 3, 1) == 0
+    finally:
+        db.close()
+    assert count_for(user_id) == 3
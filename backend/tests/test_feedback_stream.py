@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import uuid
+from app import ai_routes, ai_service, auth_cache, feedback_service, models, quota
+from app.database import SessionLocal
+
+
+def open_stream(entry_id, user_id):
+    # The route handler's response, before Starlette reads any of its body
+    async def call():
+        db = SessionLocal()
+        try:
+            user = auth_cache.snapshot(db.get(models.User, user_id))
+            return await ai_routes.ai_feedback_stream(entry_id, db, user)
+        finally:
+            db.close()
+    return call()
+
+
+async def settled():
+    # Lets detached saves, reserves and refunds finish
+    for _ in range(200):
+        if not ai_routes._detached and not quota._pending_refunds:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("stream work still pending")
+
+
+def stored(entry_id):
+    db = SessionLocal()
+    try:
+        entry = db.get(models.JournalEntry, entry_id)
+        return entry.feedback, db.get(models.User, entry.user_id).feedback_count
+    finally:
+        db.close()
+
+
+def entry_for(create_entry, auth_headers):
+    # Unique content, so the stream isn't answered from the feedback cache
+    entry_id = create_entry(content=uuid.uuid4().hex)
+    return entry_id, auth_cache.user_id_for_token(auth_headers["Authorization"].split(" ", 1)[1])
+
+
+def fake_upstream(monkeypatch, *deltas, wait: asyncio.Event = None):
+    async def stream_feedback(title, content):
+        for delta in deltas:
+            yield delta
+        if wait is not None:
+            await wait.wait()
+    monkeypatch.setattr(ai_service, "stream_feedback", stream_feedback)
+
+
+def test_stream_never_read_is_not_charged(auth_headers, create_entry, monkeypatch):
+    entry_id, user_id = entry_for(create_entry, auth_headers)
+    fake_upstream(monkeypatch, "Nice")
+
+    async def run():
+        response = await open_stream(entry_id, user_id)
+        # The client left before the body was read
+        await response.body_iterator.aclose()
+        await settled()
+
+    asyncio.run(run())
+    assert stored(entry_id) == (None, 0)
+
+
+def test_cancel_during_save_keeps_the_charge(auth_headers, create_entry, monkeypatch):
+    entry_id, user_id = entry_for(create_entry, auth_headers)
+    fake_upstream(monkeypatch, "Lovely ", "day")
+    saving, release = threading.Event(), threading.Event()
+    save_feedback = feedback_service.save_feedback
+
+    def slow_save(*args):
+        saving.set()
+        release.wait(5)
+        return save_feedback(*args)
+
+    monkeypatch.setattr(feedback_service, "save_feedback", slow_save)
+
+    async def run():
+        response = await open_stream(entry_id, user_id)
+        await response.body_iterator.__anext__()
+        await response.body_iterator.__anext__()
+        reader = asyncio.ensure_future(response.body_iterator.__anext__())
+        while not saving.is_set():
+            await asyncio.sleep(0.01)
+        # Disconnect while the save is running in its thread
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        release.set()
+        await settled()
+
+    asyncio.run(run())
+    assert stored(entry_id) == ("Lovely day", 1)
+
+
+def test_cancel_mid_stream_refunds(auth_headers, create_entry, monkeypatch):
+    entry_id, user_id = entry_for(create_entry, auth_headers)
+    fake_upstream(monkeypatch, "Lovely ", wait=asyncio.Event())
+
+    async def run():
+        response = await open_stream(entry_id, user_id)
+        assert (await response.body_iterator.__anext__()).startswith("data:")
+        reader = asyncio.ensure_future(response.body_iterator.__anext__())
+        await asyncio.sleep(0.05)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await settled()
+
+    asyncio.run(run())
+    assert stored(entry_id) == (None, 0)
+
+
+def test_over_quota_is_an_error_event(auth_headers, create_entry, monkeypatch):
+    entry_id, user_id = entry_for(create_entry, auth_headers)
+    fake_upstream(monkeypatch, "Nice")
+    monkeypatch.setattr(quota, "limit_for", lambda user: 0)
+
+    async def run():
+        response = await open_stream(entry_id, user_id)
+        return [event async for event in response.body_iterator]
+
+    events = asyncio.run(run())
+    assert len(events) == 1 and events[0].startswith("event: error")
+    assert stored(entry_id) == (None, 0)
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from app import bulk_entries
+from app.config import settings
+
+
+def ndjson(entries):
+    return "".join(json.dumps(entry) + "\n" for entry in entries).encode()
+
+
+def test_bulk_create_returns_the_new_ids(client, auth_headers):
+    entries = [{"title": f"Entry {i}", "content": f"Body {i}"} for i in range(3)]
+    response = client.post("/journal/bulk", json={"entries": entries}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 3
+    assert len(body["ids"]) == 3
+    listed = client.get("/journal?limit=10", headers=auth_headers).json()
+    assert sorted(entry["id"] for entry in listed) == sorted(body["ids"])
+
+
+def test_import_reports_only_the_count(client, auth_headers):
+    entries = [{"title": f"Entry {i}", "content": f"Body {i}"} for i in range(4)]
+    response = client.post("/journal/import", content=ndjson(entries), headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"created": 4}
+    assert len(client.get("/journal?limit=10", headers=auth_headers).json()) == 4
+
+
+def test_import_refuses_an_overlong_line(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "import_max_line_bytes", 100)
+    body = ndjson([{"title": "Short", "content": "Fine"}]) + b'{"title": "Long", "content": "' + b"x" * 200
+
+    response = client.post("/journal/import", content=body, headers=auth_headers)
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Line 2: longer than 100 bytes"
+    assert client.get("/journal?limit=10", headers=auth_headers).json() == []
+
+
+def test_import_refuses_an_overlong_line_before_its_newline(auth_headers, monkeypatch):
+    # The limit applies while the line is still arriving
+    monkeypatch.setattr(settings, "import_max_line_bytes", 100)
+
+    async def chunks():
+        for _ in range(1000):
+            yield b"x" * 50
+
+    async def run():
+        return [line async for line in bulk_entries._lines(chunks())]
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 413
+    assert raised.value.detail == "Line 1: longer than 100 bytes"
@@ -0,0 +1,25 @@
+import csv
+import io
+import json
+
+
+def test_csv_export_defuses_formulas(client, auth_headers, create_entry):
+    create_entry(title="=HYPERLINK(\"http://example.com\")", content="+1 and -1 @home")
+    create_entry(title="Plain", content="Nothing to see")
+
+    response = client.get("/journal/export?format=csv", headers=auth_headers)
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["title"], row["content"]) for row in rows] == [
+        ("'=HYPERLINK(\"http://example.com\")", "'+1 and -1 @home"),
+        ("Plain", "Nothing to see"),
+    ]
+
+
+def test_ndjson_export_keeps_values_as_written(client, auth_headers, create_entry):
+    create_entry(title="=SUM(A1:A2)", content="-just a dash")
+
+    response = client.get("/journal/export?format=ndjson", headers=auth_headers)
+
+    entry = json.loads(response.text.splitlines()[0])
+    assert (entry["title"], entry["content"]) == ("=SUM(A1:A2)", "-just a dash")
@@ -0,0 +1,18 @@
+import json
+import pytest
+
+
+@pytest.mark.parametrize("query", ["", "&q=rain"])
+def test_search_pages_entries_with_equal_timestamps_once_each(client, auth_headers, query):
+    # Imported entries can share created_at; id breaks the tie
+    entries = [{"title": f"Entry {i}", "content": "Rain all day", "created_at": "2026-01-02T03:04:05"} for i in range(5)]
+    body = "".join(json.dumps(entry) + "\n" for entry in entries)
+    assert client.post("/journal/import", content=body, headers=auth_headers).status_code == 200
+
+    ids = []
+    for offset in range(0, 6, 2):
+        page = client.get(f"/journal/search?limit=2&offset={offset}{query}", headers=auth_headers)
+        assert page.status_code == 200
+        ids += [hit["id"] for hit in page.json()]
+
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 5
@@ -0,0 +1,64 @@
+import pytest
+
+BUMP = "UPDATE users SET journal_version"
+
+
+def statements(requests):
+    # Whitespace-normalised statements the single captured request ran
+    assert len(requests) == 1
+    return [" ".join(statement.split()) for statement in requests[0].statements.elements()]
+
+
+def assert_one_write_and_bump(ran, verb):
+    assert len(ran) == 2, ran
+    write, bump = ran
+    assert write.startswith(f"{verb} ") and "journal_entries" in write and "RETURNING" in write
+    assert bump.startswith(BUMP)
+
+
+def test_create_is_insert_returning_plus_bump(create_entry, query_budget):
+    with query_budget() as requests:
+        create_entry()
+    assert_one_write_and_bump(statements(requests), "INSERT INTO")
+
+
+@pytest.mark.parametrize("method, body", [
+    ("put", {"title": "Edited", "content": "Rain all day"}),
+    ("patch", {"title": "Edited"}),
+    ("patch", {"content": "Rain all day"}),
+])
+def test_update_is_update_returning_plus_bump(client, auth_headers, create_entry, query_budget, method, body):
+    entry_id = create_entry()
+    with query_budget() as requests:
+        response = getattr(client, method)(f"/journal/{entry_id}", json=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert_one_write_and_bump(statements(requests), "UPDATE journal_entries")
+
+
+def test_delete_is_delete_returning_plus_bump(client, auth_headers, create_entry, query_budget):
+    entry_id = create_entry()
+    with query_budget() as requests:
+        assert client.delete(f"/journal/{entry_id}", headers=auth_headers).status_code == 200
+    assert_one_write_and_bump(statements(requests), "DELETE FROM")
+
+
+def test_write_to_missing_entry_is_one_statement_and_404(client, auth_headers, query_budget):
+    with query_budget() as requests:
+        assert client.patch("/journal/999999", json={"title": "x"}, headers=auth_headers).status_code == 404
+    ran = statements(requests)
+    assert len(ran) == 1 and ran[0].startswith("UPDATE journal_entries")
+
+
+def test_patch_rejects_null_content(client, auth_headers, create_entry):
+    entry_id = create_entry()
+    response = client.patch(f"/journal/{entry_id}", json={"content": None}, headers=auth_headers)
+    assert response.status_code == 422
+    assert client.get(f"/journal/{entry_id}", headers=auth_headers).json()["content"] == "Coffee and a walk"
+
+
+def test_patch_leaves_unsent_fields_alone(client, auth_headers, create_entry):
+    entry_id = create_entry()
+    response = client.patch(f"/journal/{entry_id}", json={"title": None}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["title"] is None
+    assert response.json()["content"] == "Coffee and a walk"
@@ -0,0 +1,48 @@
+import pytest
+
+
+def single(requests):
+    assert len(requests) == 1
+    return requests[0]
+
+
+def test_create_stays_within_write_budget(create_entry, query_budget):
+    with query_budget() as requests:
+        create_entry()
+    assert single(requests).budget == 3
+
+
+@pytest.mark.parametrize("path", ["/journal", "/journal?view=summary", "/journal/search?q=coffee"])
+def test_reads_stay_within_read_budget(client, auth_headers, create_entry, query_budget, path):
+    for i in range(3):
+        create_entry(title=f"Entry {i}")
+    with query_budget() as requests:
+        assert client.get(path, headers=auth_headers).status_code == 200
+    assert single(requests).budget == 3
+
+
+def test_get_entry_stays_within_read_budget(client, auth_headers, create_entry, query_budget):
+    entry_id = create_entry()
+    with query_budget() as requests:
+        assert client.get(f"/journal/{entry_id}", headers=auth_headers).status_code == 200
+    assert single(requests).budget == 3
+
+
+def test_me_is_one_query_or_less(client, auth_headers, query_budget):
+    with query_budget() as requests:
+        assert client.get("/me", headers=auth_headers).status_code == 200
+    assert single(requests).budget == 1
+
+
+def test_ai_feedback_stays_within_budget(client, auth_headers, create_entry, query_budget):
+    # No workers run in tests, so this only queues the job
+    entry_id = create_entry()
+    with query_budget() as requests:
+        assert client.post(f"/ai-feedback/{entry_id}", headers=auth_headers).status_code == 202
+    assert single(requests).budget == 6
+
+
+def test_going_over_fails_the_test(client, auth_headers, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="GET /journal ran"):
+        with query_budget(0):
+            client.get("/journal", headers=auth_headers)
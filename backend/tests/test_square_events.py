@@ -0,0 +1,37 @@
+import json
+import uuid
+from app import auth_cache, models, quota, square_events
+from app.config import settings
+from app.database import SessionLocal
+
+
+def deliver_payment(client, email) -> int:
+    body = {
+        "event_id": uuid.uuid4().hex,
+        "type": "payment.updated",
+        "data": {"object": {"payment": {"buyer_email_address": email}}},
+    }
+    assert client.post("/webhook/square", content=json.dumps(body)).status_code == 200
+    db = SessionLocal()
+    try:
+        return db.query(models.SquareEvent.id).filter(models.SquareEvent.event_id == body["event_id"]).scalar()
+    finally:
+        db.close()
+
+
+def test_upgrade_starts_a_fresh_quota_period(client, auth_headers, create_entry, monkeypatch):
+    monkeypatch.setattr(settings, "feedback_limit_premium", 3)
+    me = client.get("/me", headers=auth_headers).json()
+    user_id = auth_cache.user_id_for_token(auth_headers["Authorization"].split(" ", 1)[1])
+    db = SessionLocal()
+    try:
+        assert quota.reserve(db, user_id, settings.feedback_limit_free, settings.feedback_limit_free)
+    finally:
+        db.close()
+
+    square_events.process(deliver_payment(client, me["email"]))
+
+    me = client.get("/me", headers=auth_headers).json()
+    assert me["is_premium"] and me["feedback_count"] == 0
+    entry_id = create_entry(content=uuid.uuid4().hex)
+    assert client.post(f"/ai-feedback/{entry_id}", headers=auth_headers).status_code == 202
@@ -0,0 +1,40 @@
+# backend/worker.py
+# Standalone AI feedback worker, email outbox dispatcher and Square event
+# processor. Run next to the API with FEEDBACK_WORKERS=0, EMAIL_WORKERS=0
+# and SQUARE_EVENT_WORKERS=0 there to move that work out of the web process:
+#
+#   python worker.py [worker_count]
+
+import asyncio
+import signal
+import sys
+from app import models, ai_service, email_outbox, feedback_jobs, square_events
+from app.config import settings
+from app.database import engine
+
+models.Base.metadata.create_all(bind=engine)
+
+
+async def main(count: int):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = feedback_jobs.start_workers(count)
+    dispatchers = email_outbox.start_dispatchers(max(settings.email_workers, 1))
+    processors = square_events.start_processors(max(settings.square_event_workers, 1))
+    print(f"Started {count} AI feedback workers, {len(dispatchers)} email dispatchers "
+          f"and {len(processors)} Square event processors")
+    await stop.wait()
+
+    print("Stopping background workers")
+    await square_events.stop_processors(processors)
+    await email_outbox.stop_dispatchers(dispatchers)
+    await feedback_jobs.stop_workers(tasks)
+    await ai_service.aclose()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else max(settings.feedback_workers, 1)
+    asyncio.run(main(count))
@@ -202,6 +202,29 @@ const Journal = ({ token, setToken }) => {
     }
   };
 
+  // AI feedback is generated by a background job; poll it until it settles
+  const waitForFeedbackJob = async (statusUrl) => {
+    for (let attempt = 0; attempt < 60; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const res = await fetch(`${API_BASE_URL}${statusUrl}`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
+      const job = await res.json();
+      if (!res.ok) {
+        return { ok: false, data: job };
+      }
+      if (job.status === "done") {
+        return { ok: true, data: job };
+      }
+      if (job.status === "failed") {
+        return { ok: false, data: { detail: job.error } };
+      }
+    }
+    return { ok: false, data: { detail: "AI feedback is taking too long." } };
+  };
+
   const handleGetFeedback = async (id) => {
     setLoadingStates((prev) => ({
       ...prev,
@@ -216,10 +239,15 @@ const Journal = ({ token, setToken }) => {
         },
       });
 
-      const data = await response.json();
+      let data = await response.json();
+      let ok = response.ok;
       console.log("AI feedback response:", response.status, data);
 
-      if (response.ok) {
+      if (response.status === 202) {
+        ({ ok, data } = await waitForFeedbackJob(data.status_url));
+      }
+
+      if (ok) {
         const entryIndex = entries.findIndex((entry) => entry.id === id);
         const updatedEntries = [...entries];
         updatedEntries[entryIndex] = {